@@ -2,23 +2,20 @@
 
 """ Module for configuring email delivery handler """
 
-import os
-
 from pathlib import Path
-from dotenv import load_dotenv
 from fastapi_mail import ConnectionConfig
+from app.config.settings import get_settings
 from app.dependencies.error import httpError
 
 
-# Load the environment variables from the .env file
-load_dotenv()
+settings = get_settings()
 
-username = os.getenv('MAIL_USERNAME')
-password = os.getenv('MAIL_PASSWORD')
-from_email = os.getenv('MAIL_FROM')
-mail_server = os.getenv('MAIL_SERVER')
-mail_port = os.getenv('MAIL_PORT')
-from_name = os.getenv('MAIL_FROM_NAME')
+username = settings.mail_username
+password = settings.mail_password
+from_email = settings.mail_from
+mail_server = settings.mail_server
+mail_port = settings.mail_port
+from_name = settings.mail_from_name
 
 if not username or not password:
     raise httpError(status_code=500, detail="Missing email configuration environment variables")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+"""
+Logging of the app: one JSON object per line on stdout, tagged with the id
+of the request being served.
+
+Records are put on a bounded in-memory queue by the thread that logs them
+and written out by a background thread, so logging never blocks the event
+loop on stdout. When the queue is full new records are dropped and
+counted instead of waiting.
+
+    LOG_LEVEL=INFO                                  root level
+    LOG_LEVELS=app.sql=WARNING,botocore=ERROR       per-logger levels
+    LOG_SAMPLE_RATES=app.access=0.1                 share of INFO/DEBUG records kept per logger
+    LOG_FORMAT=json                                 or text, for development
+    LOG_QUEUE_SIZE=10000                            records waiting to be written
+
+Warnings and errors are never sampled.
+"""
+
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from app.config.settings import get_settings
+
+
+settings = get_settings()
+
+# Id of the request being served, set by the middleware in app.main
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has, anything else was passed in `extra`
+record_attributes = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def parse_pairs(value: str) -> dict:
+    """Parses "a=1,b=2" into {"a": "1", "b": "2"}"""
+    pairs = {}
+    for item in value.split(","):
+        name, _, setting = item.partition("=")
+        if name.strip() and setting.strip():
+            pairs[name.strip()] = setting.strip()
+    return pairs
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single line JSON object"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in record_attributes and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Tags records with the current request id, in the thread that logs them"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a share of the INFO and DEBUG records of noisy loggers"""
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def rate(self, name: str) -> float:
+        # The most specific configured logger wins, e.g. app.sql over app
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of waiting when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message and traceback now, the arguments may change
+        # before the writer thread gets to them
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+queue_handler: Optional[NonBlockingQueueHandler] = None
+listener: Optional[QueueListener] = None
+
+
+def output_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "text":
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    else:
+        handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def start_listener():
+    """Starts the thread writing the queued records, with a queue of its own"""
+    global listener
+    queue_handler.queue = queue.Queue(maxsize=settings.log_queue_size)
+    listener = QueueListener(queue_handler.queue, output_handler())
+    listener.start()
+
+
+def stop_logging():
+    """Writes out the records still queued and stops the writer thread"""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+
+def configure_logging():
+    """Routes all logging through the queue, once per process"""
+    global queue_handler
+    if queue_handler is not None:
+        return
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(SamplingFilter({name: float(rate) for name, rate in parse_pairs(settings.log_sample_rates).items()}))
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.log_level.upper())
+    for name, level in parse_pairs(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level.upper())
+    start_listener()
+    # Threads don't survive fork(), each worker starts its own writer
+    os.register_at_fork(after_in_child=start_listener)
+    atexit.register(stop_logging)
+
+
+def get_dropped_records() -> int:
+    """Returns how many records this process dropped because the queue was full"""
+    return queue_handler.dropped if queue_handler is not None else 0
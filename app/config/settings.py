@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+"""
+Settings of the app, read once from the environment and the .env file.
+
+Modules take their configuration from `get_settings()` instead of calling
+load_dotenv() and os.getenv() at import time. Field names are the
+environment variable names in lower case, e.g. REDIS_PORT -> redis_port.
+Empty values in .env count as unset, so the field keeps its default.
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+env_file = Path(__file__).resolve().parents[2] / ".env"
+
+
+class Settings(BaseSettings):
+    """Typed view of the environment variables the app reads"""
+
+    model_config = SettingsConfigDict(env_file=env_file, env_ignore_empty=True, extra="ignore")
+
+    # app
+    environment: Optional[str] = None # test/production, picks the database
+    log_level: str = "INFO"
+    log_levels: str = "" # per-logger levels, e.g. app.sql=WARNING,botocore=ERROR
+    log_sample_rates: str = "" # share of INFO/DEBUG records kept per logger, e.g. app.access=0.1
+    log_format: str = "json" # json/text
+    log_queue_size: int = 10000 # records waiting for the writer thread, more are dropped
+
+    # server, see main.py
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    web_concurrency: Optional[int] = None # worker processes, one per CPU when unset
+    server_backlog: int = 2048
+    server_keepalive_timeout: int = 5 # seconds an idle keep-alive connection stays open
+    server_worker_timeout: int = 60 # a worker silent for longer is restarted
+    server_graceful_timeout: int = 30 # seconds workers get to finish in-flight requests on SIGTERM
+    server_max_requests: int = 0 # restart a worker after this many requests, 0 never
+    server_max_requests_jitter: int = 0
+    forwarded_allow_ips: str = "127.0.0.1" # proxies trusted for X-Forwarded-* headers
+
+    # database
+    postgres_test_uri: Optional[str] = None
+    postgres_prod_uri: Optional[str] = None
+    postgres_replica_uris: str = "" # comma separated
+    replica_balancing: str = "round_robin" # round_robin/least_connections
+    replica_unhealthy_cooldown: float = 30
+    replica_read_your_writes_seconds: int = 5
+    db_connection_budget: int = 90
+    db_pool_size: Optional[int] = None # overrides the size derived from the budget
+    db_max_overflow: Optional[int] = None # overrides the overflow derived from the budget
+    db_pool_timeout: float = 10
+    db_pool_recycle: int = 1800
+    db_pool_prewarm: int = 2 # connections opened per pool when a worker starts
+    db_pgbouncer: bool = False
+    sql_slow_query_ms: float = 200
+    sql_log_sample_rate: float = 0.01
+    sql_stats_max_statements: int = 500
+    migration_lock_timeout: str = "5s"
+    migration_batch_size: int = 1000
+    migration_batch_pause: float = 0.1
+
+    # redis
+    redis_host: str = "localhost"
+    redis_port: int = 6379
+    redis_db: int = 0
+    redis_password: Optional[str] = None
+    redis_ssl: bool = False
+    redis_max_connections: int = 50
+    redis_pool_timeout: int = 5
+    redis_pool_prewarm: int = 2 # connections opened when a worker starts
+    bloom_filter_key: str = "bloom:user_emails"
+    bloom_filter_capacity: int = 1000000
+    bloom_filter_error_rate: float = 0.001
+
+    # auth
+    jwt_secret_key: Optional[str] = None
+    jwt_algorithm: Optional[str] = None
+    admin_jwt_token_expiry_minutes: int = 60
+    password_jwt_token_expiry_minutes: int = 60
+    pin_jwt_token_expiry_minutes: int = 60
+    superuser_secret: Optional[str] = None
+    otp_expiry: int = 600
+
+    # metrics
+    prometheus_multiproc_dir: Optional[str] = None # shared by the workers, a temp directory when unset
+    metrics_token: Optional[str] = None # when set, /metrics requires "Authorization: Bearer <token>"
+    metrics_sample_interval: float = 5 # seconds between pool gauge and event-loop lag samples
+    bcrypt_threads: int = 2 # threads per worker hashing passwords
+
+    # tracing, see app/dependencies/tracing.py
+    tracing_exporter: str = "none" # none/file/otlp
+    tracing_sample_ratio: float = 0.1
+    tracing_file_dir: str = "/tmp/ouul-traces"
+    tracing_otlp_endpoint: Optional[str] = None # e.g. http://localhost:4318/v1/traces
+    tracing_service_name: str = "ouul-be"
+
+    # users
+    user_bulk_invite_max_rows: int = 5000
+    user_invite_email_batch_size: int = 100
+
+    # email
+    mail_username: Optional[str] = None
+    mail_password: Optional[str] = None
+    mail_from: Optional[str] = None
+    mail_server: Optional[str] = None
+    mail_port: Optional[int] = None
+    mail_from_name: Optional[str] = None
+    zeptomail_api_key: Optional[str] = None
+    zeptomail_url: Optional[str] = None
+    email_api_timeout: float = 10
+
+    # outbound calls
+    retry_max_attempts: int = 3
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 10
+    retry_budget_ratio: float = 0.2
+    retry_budget_max_tokens: float = 10
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30
+
+    # file storage
+    file_upload_max_retries: int = 3
+    file_upload_max_bytes: int = 200 * 1024 * 1024
+    file_upload_chunk_size: int = 20 * 1024 * 1024 # cloudinary needs at least 5MB
+    file_upload_concurrency: int = 4
+    cloudinary_cloud_name: Optional[str] = None
+    cloudinary_api_key: Optional[str] = None
+    cloudinary_api_secret: Optional[str] = None
+    aws_access_key_id: Optional[str] = None
+    aws_secret_access_key: Optional[str] = None
+    aws_region: Optional[str] = None
+    aws_s3_bucket_name: Optional[str] = None
+    aws_s3_endpoint_url: Optional[str] = None # for S3 compatible stores, e.g. minio
+    aws_s3_max_pool_connections: int = 20
+    aws_s3_multipart_threshold: int = 16 * 1024 * 1024
+    aws_s3_multipart_chunksize: int = 16 * 1024 * 1024
+    aws_s3_transfer_concurrency: int = 8
+
+    # media
+    media_upload_provider: str = "cloudinary"
+    media_upload_folder: str = "media"
+    media_upload_expiry_seconds: int = 900
+    media_cache_dir: str = "/tmp/ouul-media-cache"
+    media_cache_max_bytes: int = 1024 * 1024 * 1024
+    media_download_chunk_size: int = 1024 * 1024
+    media_download_timeout: float = 30
+    media_thumbnail_size: int = 320
+    media_derivative_widths: str = "640,1280" # comma separated
+
+    @property
+    def workers(self) -> int:
+        """Number of worker processes, WEB_CONCURRENCY or one per CPU the app may run on"""
+        if self.web_concurrency:
+            return self.web_concurrency
+        if hasattr(os, "sched_getaffinity"):
+            return len(os.sched_getaffinity(0))
+        return os.cpu_count() or 1
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Returns the settings, read from the environment on the first call"""
+    return Settings()
@@ -1,24 +1,37 @@
 #!/usr/bin/env python
 
 
-import bcrypt, os
+import time
+import asyncio
+import logging
+import bcrypt
+from concurrent.futures import ThreadPoolExecutor
+from app.dependencies import metrics
 from app.dependencies.error import httpError
+from app.dependencies.request_timing import timed
+from app.dependencies.tracing import tracer
 from app.models.admins import Admin
 from app.models.users import User
+from app.models import queries
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
+from app.config.settings import get_settings
 
-# Load the environment variables from the .env file
-load_dotenv()
+settings = get_settings()
 
-secret_key = os.getenv("JWT_SECRET_KEY")
-algorithm = os.getenv("JWT_ALGORITHM")
+secret_key = settings.jwt_secret_key
+algorithm = settings.jwt_algorithm
 
+logger = logging.getLogger(__name__)
 
-def check_adminSignupSchema(admin: dict, db: Session):
+# bcrypt is slow on purpose, it runs on a few threads of its own so hashing
+# never blocks the event loop and logins can't take every thread of the worker
+bcrypt_executor = ThreadPoolExecutor(max_workers=settings.bcrypt_threads, thread_name_prefix="bcrypt")
+
+
+async def check_adminSignupSchema(admin: dict, db: AsyncSession):
     """
     Checks if all required fields are provided for admin registration
     and confirms if the admin exists
@@ -32,19 +45,30 @@ def check_adminSignupSchema(admin: dict, db: Session):
     elif admin.get("password") is None or len(admin.get("password")) == 0: # type: ignore
         # Checks if password is provided
         raise httpError(status_code=400, detail="Password is required")
-    elif db.query(Admin).filter(Admin.email == admin.get("email")).first() is not None: # type: ignore
+    elif await db.scalar(queries.admin_by_email, {"email": admin.get("email")}) is not None: # type: ignore
         # Checks if user already exists with supplied email address
         raise httpError(status_code=400, detail="Admin already exists")
-    elif db.query(Admin).filter(Admin.username == admin.get("username")).first() is not None:
+    elif await db.scalar(queries.admin_by_username, {"username": admin.get("username")}) is not None:
         # Checks if user already exists with supplied username
         raise httpError(status_code=400, detail="Admin already exists")
 
-def hash_password(password: str):
+async def run_bcrypt(operation: str, function, *args):
+    """Runs a bcrypt function on the bcrypt threads, timing it and counting the queue"""
+    metrics.bcrypt_queue_depth.inc()
+    started_at = time.perf_counter()
+    try:
+        with timed("bcrypt"), tracer.start_as_current_span(f"bcrypt {operation}"):
+            return await asyncio.get_running_loop().run_in_executor(bcrypt_executor, function, *args)
+    finally:
+        metrics.bcrypt_queue_depth.dec()
+        metrics.bcrypt_duration.labels(operation).observe(time.perf_counter() - started_at)
+
+async def hash_password(password: str):
     """
     Hashes admin's password
     """
     salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+    hashed = await run_bcrypt("hash", bcrypt.hashpw, password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 def create_access_token(data: dict, expires_delta: timedelta):
@@ -68,14 +92,14 @@ def validate_admin(token: str) -> str:
         email: str = str(payload.get("adminEmail"))
         id: str = str(payload.get("adminId"))
         if email is None:
-            print("No email")
+            logger.info("Token without an email")
             raise credentials_exception
         if id is None:
-            print("No admin id")
+            logger.info("Token without an admin id")
             raise credentials_exception
         return id
     except JWTError as e:
-        print("jwt err: {}".format(str(e)))
+        logger.info("Invalid token: %s", str(e))
         raise credentials_exception
 
 def validate_user(token: str) -> str:
@@ -88,40 +112,40 @@ def validate_user(token: str) -> str:
         email: str = str(payload.get("userEmail"))
         id: str = str(payload.get("userId"))
         if email is None:
-            print("No email")
+            logger.info("Token without an email")
             raise credentials_exception
         if id is None:
-            print("No user id")
+            logger.info("Token without a user id")
             raise credentials_exception
         return id
     except JWTError as e:
-        print("jwt err: {}".format(str(e)))
+        logger.info("Invalid token: %s", str(e))
         raise credentials_exception
 
-def get_admin(Id: str, db: Session) -> Admin:
+async def get_admin(Id: str, db: AsyncSession) -> Admin:
     """
     Checks if there is an admin with the id passed as a parameter
     """
     try:
-        admin: Admin = db.query(Admin).filter_by(id = Id).first()
+        admin: Admin = await db.scalar(queries.admin_by_id, {"id": Id})
         return admin
     except Exception as e:
-        print("Error: {}".format(str(e)))
+        logger.exception(str(e))
         raise httpError(status_code=400, detail="Bad request")
 
-def get_user(Id: str, db: Session) -> User:
+async def get_user(Id: str, db: AsyncSession) -> User:
     """
     Checks if there is an admin with the id passed as a parameter
     """
     try:
-        user: User = db.query(User).filter_by(id = Id).first()
+        user: User = await db.scalar(queries.user_by_id, {"id": Id})
         return user
     except Exception as e:
-        print("Error: {}".format(str(e)))
+        logger.exception(str(e))
         raise httpError(status_code=400, detail="Bad request")
 
-def verify_password(password: str, hashed: str) -> bool:
+async def verify_password(password: str, hashed: str) -> bool:
     """
     Verifies admin's password
     """
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    return await run_bcrypt("verify", bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
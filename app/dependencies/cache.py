@@ -1,28 +1,109 @@
 #!/usr/bin/env python3
 
-""" Creates and generates a Database session """
+""" Creates and manages the process-wide Redis connection pool """
 
-import os
-import redis
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import logging
+import redis.asyncio as redis
+from redis.asyncio.connection import SSLConnection
+from redis.exceptions import RedisError
+from app.config.settings import get_settings
+from app.dependencies import metrics
+from app.dependencies.request_timing import TimedRedis
 
 
-# Load the environment variables from the .env file
-load_dotenv()
+settings = get_settings()
 
-# environment = os.getenv("ENVIRONMENT")
+logger = logging.getLogger(__name__)
 
-# if environment == 'test':
-#     database_url = os.getenv("POSTGRES_TEST_URI")
-# elif environment == 'production':
-#     database_url = os.getenv("POSTGRES_PROD_URI")
+redis_host = settings.redis_host
+redis_port = settings.redis_port
+redis_db = settings.redis_db
+redis_password = settings.redis_password
+redis_ssl = settings.redis_ssl
+redis_max_connections = settings.redis_max_connections
+redis_pool_timeout = settings.redis_pool_timeout
 
-def get_cache():
-    """Generates a new redis session with dependency injection"""
-    r = redis.Redis()
+# The pool is created once per worker process by the app lifespan
+pool: redis.BlockingConnectionPool = None
+
+
+def create_cache_pool() -> redis.BlockingConnectionPool:
+    """Creates the process-wide redis connection pool"""
+    global pool
+    if pool is None:
+        connection_kwargs = {
+            "host": redis_host,
+            "port": redis_port,
+            "db": redis_db,
+            "password": redis_password,
+            "decode_responses": True,
+        }
+        if redis_ssl:
+            connection_kwargs["connection_class"] = SSLConnection
+        pool = redis.BlockingConnectionPool(max_connections=redis_max_connections,
+                                            timeout=redis_pool_timeout,
+                                            **connection_kwargs)
+    return pool
+
+
+async def warm_cache_pool(connections: int):
+    """
+    Opens connections when a worker starts, so its first requests do not wait
+    for connects. A redis that cannot be reached is reported and left to
+    connect on demand.
+    """
+    pool = create_cache_pool()
+    borrowed = []
+    try:
+        for _ in range(min(connections, redis_max_connections)):
+            # The pool connects the connection before handing it out
+            borrowed.append(await pool.get_connection("PING"))
+    except (RedisError, OSError) as e:
+        logger.warning("Could not pre-warm the redis connection pool: %s", str(e))
+    finally:
+        for connection in borrowed:
+            await pool.release(connection)
+
+
+async def close_cache_pool():
+    """Disconnects every connection held by the redis connection pool"""
+    global pool
+    if pool is not None:
+        await pool.disconnect()
+        pool = None
+
+
+def get_cache_pool_stats() -> dict:
+    """Returns usage statistics for the redis connection pool"""
+    if pool is None:
+        return {
+            "max_connections": redis_max_connections,
+            "created_connections": 0,
+            "in_use_connections": 0,
+            "available_connections": 0,
+        }
+    in_use = len(pool._in_use_connections)
+    available = len(pool._available_connections)
+    return {
+        "max_connections": pool.max_connections,
+        "created_connections": in_use + available,
+        "in_use_connections": in_use,
+        "available_connections": available,
+    }
+
+
+def export_cache_metrics():
+    """Copies the connection counts of this worker's redis pool to the metrics gauges"""
+    stats = get_cache_pool_stats()
+    metrics.redis_pool_connections.labels("in_use").set(stats["in_use_connections"])
+    metrics.redis_pool_connections.labels("available").set(stats["available_connections"])
+
+
+async def get_cache():
+    """Borrows a redis client from the shared pool with dependency injection"""
+    r = TimedRedis(connection_pool=create_cache_pool())
     try:
         yield r
     finally:
-        r.close()
\ No newline at end of file
+        # Only releases the client, the pooled connections stay open
+        await r.aclose(close_connection_pool=False)
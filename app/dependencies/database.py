@@ -2,29 +2,200 @@
 
 """ Creates and generates a Database session """
 
-import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import time
+import asyncio
+import logging
+import itertools
+from fastapi import Depends, Request
+from jose import JWTError, jwt
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker, Session as SyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.config.settings import get_settings
+from app.dependencies.cache import get_cache
+from app.dependencies.sql_logging import install_sql_logging
+from app.dependencies.db_pool import engine_options, install_pool_telemetry
 
 
-# Load the environment variables from the .env file
-load_dotenv()
+settings = get_settings()
 
-environment = os.getenv("ENVIRONMENT")
+logger = logging.getLogger(__name__)
+
+environment = settings.environment
 
 if environment == 'test':
-    database_url = os.getenv("POSTGRES_TEST_URI")
+    database_url = settings.postgres_test_uri
 elif environment == 'production':
-    database_url = os.getenv("POSTGRES_PROD_URI")
+    database_url = settings.postgres_prod_uri
+
+replica_urls = [url.strip() for url in settings.postgres_replica_uris.split(",") if url.strip()]
+replica_balancing = settings.replica_balancing # round_robin/least_connections
+replica_unhealthy_cooldown = settings.replica_unhealthy_cooldown
+read_your_writes_seconds = settings.replica_read_your_writes_seconds
+prewarm_timeout = settings.db_pool_timeout
+
+
+def to_async_url(url: str) -> str:
+    """The app talks to Postgres through asyncpg so queries never block the event loop"""
+    return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+async_database_url = to_async_url(database_url)
+
+
+class PrimarySession(SyncSession):
+    """Session class of the primary, remembers whether it committed anything"""
+
+@event.listens_for(PrimarySession, "after_commit")
+def flag_write(session):
+    session.info["wrote"] = True
+
+
+engine = create_async_engine(async_database_url, **engine_options("primary"))
+install_sql_logging(engine.sync_engine)
+install_pool_telemetry("primary", engine.sync_engine)
+# Objects stay usable after commit, reloading expired attributes would need another await
+Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False,
+                             sync_session_class=PrimarySession)
+
+
+class Replica:
+    """A read replica with its own engine and health state"""
+
+    def __init__(self, url: str, name: str):
+        self.url = url
+        self.name = name
+        self.engine = create_async_engine(to_async_url(url), pool_pre_ping=True,
+                                          **engine_options(name))
+        install_sql_logging(self.engine.sync_engine)
+        install_pool_telemetry(name, self.engine.sync_engine)
+        self.Session = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        self.unhealthy_until = 0.0
+
+    def is_healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def mark_unhealthy(self):
+        self.unhealthy_until = time.monotonic() + replica_unhealthy_cooldown
+
+    def connections(self) -> int:
+        pool = self.engine.sync_engine.pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+
+replicas = [Replica(url, f"replica{index}") for index, url in enumerate(replica_urls, 1)]
+replica_cycle = itertools.cycle(replicas)
+
+
+async def close_db_pools():
+    """Closes the pooled connections to the primary and every replica"""
+    await engine.dispose()
+    for replica in replicas:
+        await replica.engine.dispose()
+
+
+async def warm_engine(engine, connections: int):
+    """Opens connections at once, so they are distinct and all go back to the pool"""
+    async def connect():
+        async with engine.connect() as connection:
+            await connection.exec_driver_sql("SELECT 1")
+    await asyncio.gather(*[connect() for _ in range(connections)])
+
+
+async def warm_db_pools(connections: int):
+    """
+    Opens connections to the primary and every replica when a worker starts,
+    so its first requests do not wait for connects. Pools that keep no
+    connections (behind pgbouncer) are skipped, a database that cannot be
+    reached in DB_POOL_TIMEOUT seconds is reported and left to connect on
+    demand, so a hanging replica does not hold up the worker's startup.
+    """
+    for name, pool_engine in [("primary", engine)] + [(replica.name, replica.engine) for replica in replicas]:
+        pool = pool_engine.sync_engine.pool
+        if not hasattr(pool, "size"):
+            continue
+        try:
+            await asyncio.wait_for(warm_engine(pool_engine, min(connections, pool.size())), prewarm_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Could not pre-warm the %s connection pool within %ss", name, prewarm_timeout)
+        except (SQLAlchemyError, OSError) as e:
+            logger.warning("Could not pre-warm the %s connection pool: %s", name, str(e))
+
+
+def choose_replica() -> Replica:
+    """Picks a healthy replica with the configured balancing, or None if there is none"""
+    healthy = [replica for replica in replicas if replica.is_healthy()]
+    if not healthy:
+        return None
+    if replica_balancing == "least_connections":
+        return min(healthy, key=lambda replica: replica.connections())
+    for _ in range(len(replicas)):
+        replica = next(replica_cycle)
+        if replica.is_healthy():
+            return replica
+
+
+def request_principal(request: Request) -> str:
+    """Returns the admin or user id carried by the request's token, if any"""
+    authorization = request.headers.get("Authorization", "")
+    token = authorization[7:] if authorization.lower().startswith("bearer ") else None
+    token = token or request.headers.get("X-Password-Authorization-Token")
+    if not token:
+        return None
+    try:
+        claims = jwt.get_unverified_claims(token)
+    except JWTError:
+        return None
+    id = claims.get("adminId") or claims.get("userId")
+    return str(id) if id else None
+
+
+async def get_db(request: Request, cache = Depends(get_cache)):
+    """Generates a new primary database session with dependency injection"""
+    async with Session() as db:
+        yield db
+        principal = request_principal(request)
+        if db.sync_session.info.get("wrote") and principal:
+            # Send this principal's reads to the primary until replicas have caught up
+            await cache.set(f"read-your-writes:{principal}", 1, ex=read_your_writes_seconds)
+
+
+async def get_read_db(request: Request, cache = Depends(get_cache)):
+    """
+    Generates a database session for read-only routes. It reads from a
+    replica unless there is none, none is healthy, or the principal wrote
+    to the primary recently.
+    """
+    replica = choose_replica()
+    principal = request_principal(request)
+    if replica is not None and principal is not None:
+        if await cache.exists(f"read-your-writes:{principal}"):
+            replica = None
+    if replica is not None:
+        db = replica.Session()
+        try:
+            # Check a connection out now so an unreachable replica falls back to the primary
+            await db.connection()
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+            logger.warning("Replica %s unhealthy: %s", replica.engine.url.host, str(e))
+            replica.mark_unhealthy()
+            await db.close()
+        else:
+            try:
+                yield db
+            finally:
+                await db.close()
+            return
+    async with Session() as db:
+        yield db
 
-engine = create_engine(database_url, echo=True, pool_size=50, max_overflow=10)
-Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
-    """Generates a new database session with dependency injection"""
-    db = Session()
+def get_sync_db():
+    """Generates a blocking database session for scripts and tests"""
+    sync_engine = create_engine(database_url)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        sync_engine.dispose()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+"""
+Sizes the SQLAlchemy connection pools from a global connection budget and
+collects pool telemetry (checkouts, overflow, wait time, timeouts).
+
+Every uvicorn worker holds its own pool per database, so the budget is
+split across the workers (WEB_CONCURRENCY, or one per CPU): each worker
+gets at most DB_CONNECTION_BUDGET // workers connections to any one server.
+With DB_PGBOUNCER=true the app keeps no pool of its own and disables
+prepared statements, so it can run behind a transaction-level pooler.
+"""
+
+import time
+from uuid import uuid4
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from app.config.settings import get_settings
+from app.dependencies import metrics
+
+
+settings = get_settings()
+
+connection_budget = settings.db_connection_budget
+workers = settings.workers
+pool_timeout = settings.db_pool_timeout
+pool_recycle = settings.db_pool_recycle
+pgbouncer = settings.db_pgbouncer
+
+# Share of each worker's connections kept open, the rest is overflow
+pool_size_ratio = 0.8
+
+
+def pool_sizes(budget: int, workers: int) -> tuple:
+    """
+    Returns (pool_size, max_overflow) so all workers together stay within
+    budget. Raises ValueError when the budget can't give every worker one
+    connection.
+    """
+    if budget < workers:
+        raise ValueError(f"A connection budget of {budget} cannot give each of {workers} workers a connection, "
+                         "raise DB_CONNECTION_BUDGET or lower WEB_CONCURRENCY")
+    per_worker = budget // max(1, workers)
+    pool_size = settings.db_pool_size or max(1, int(per_worker * pool_size_ratio))
+    max_overflow = settings.db_max_overflow if settings.db_max_overflow is not None else max(0, per_worker - pool_size)
+    return pool_size, max_overflow
+
+
+class PoolStats:
+    """Counters for one connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def record_wait(self, elapsed_ms: float):
+        self.waits += 1
+        self.wait_total_ms += elapsed_ms
+        self.wait_max_ms = max(self.wait_max_ms, elapsed_ms)
+
+    def to_dict(self) -> dict:
+        data = {
+            "name": self.name,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "wait_mean_ms": round(self.wait_total_ms / self.waits, 3) if self.waits else 0.0,
+            "wait_max_ms": round(self.wait_max_ms, 3),
+        }
+        pool = self.engine.pool if self.engine is not None else None
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            data.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+            })
+        return data
+
+
+pool_stats: dict = {}
+
+
+def instrumented_pool_class(stats: PoolStats):
+    """Returns a queue pool class that times how long checkouts wait for a connection"""
+
+    class InstrumentedPool(AsyncAdaptedQueuePool):
+        def _do_get(self):
+            started_at = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                stats.timeouts += 1
+                metrics.db_pool_timeouts.labels(stats.name).inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - started_at
+                stats.record_wait(elapsed * 1000)
+                metrics.db_pool_wait.labels(stats.name).observe(elapsed)
+
+    return InstrumentedPool
+
+
+def engine_options(name: str) -> dict:
+    """Returns the create_async_engine keyword arguments for the named database"""
+    stats = pool_stats[name] = PoolStats(name)
+    if pgbouncer:
+        return {
+            "poolclass": NullPool,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                # Unnamed statements would clash across server connections behind the pooler
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            },
+        }
+    pool_size, max_overflow = pool_sizes(connection_budget, workers)
+    return {
+        "poolclass": instrumented_pool_class(stats),
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+    }
+
+
+def install_pool_telemetry(name: str, engine):
+    """Counts pool events of an engine (pass async_engine.sync_engine for async engines)"""
+    stats = pool_stats[name]
+    stats.engine = engine
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        stats.checkins += 1
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+
+
+def get_pool_stats() -> list:
+    """Returns the telemetry of every connection pool in this worker"""
+    return [stats.to_dict() for stats in pool_stats.values()]
+
+
+def export_pool_metrics():
+    """Copies the connection counts of this worker's pools to the metrics gauges"""
+    for data in get_pool_stats():
+        if "size" in data:
+            metrics.db_pool_connections.labels(data["name"], "checked_out").set(data["checked_out"])
+            metrics.db_pool_connections.labels(data["name"], "idle").set(data["checked_in"])
+            metrics.db_pool_connections.labels(data["name"], "overflow").set(data["overflow"])
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+"""
+Prometheus metrics of the app, served on GET /metrics.
+
+Under the launcher (main.py) every worker process writes its samples to
+files in PROMETHEUS_MULTIPROC_DIR and /metrics adds up the files of all
+workers, so any worker can answer a scrape for the whole server. Without
+that directory, e.g. under `uvicorn --reload`, the metrics of the single
+process are served as they are.
+
+Counters and histograms are updated where the work happens. Gauges of
+state that only the owning worker can see (pool usage, circuit state,
+dropped log records) are refreshed by sample_runtime(), which also measures event-loop lag.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest, multiprocess)
+from app.config.logging_config import get_dropped_records
+
+
+logger = logging.getLogger(__name__)
+
+# Read by prometheus_client itself when it is imported, set up by main.py
+multiprocess_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+content_type = CONTENT_TYPE_LATEST
+
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# requests
+request_duration = Histogram("http_request_duration_seconds", "Time to serve a request",
+                             ["method", "route"], buckets=latency_buckets)
+requests_total = Counter("http_requests_total", "Requests served", ["method", "route", "status"])
+requests_in_progress = Gauge("http_requests_in_progress", "Requests being served",
+                             multiprocess_mode="livesum")
+
+# connection pools
+db_pool_connections = Gauge("db_pool_connections", "Connections of a database pool by state",
+                            ["pool", "state"], multiprocess_mode="livesum")
+db_pool_wait = Histogram("db_pool_wait_seconds", "Time a checkout waited for a database connection",
+                         ["pool"], buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10))
+db_pool_timeouts = Counter("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection", ["pool"])
+redis_pool_connections = Gauge("redis_pool_connections", "Connections of the redis pool by state",
+                               ["state"], multiprocess_mode="livesum")
+
+# bcrypt
+bcrypt_queue_depth = Gauge("bcrypt_queue_depth", "bcrypt operations waiting for or running on a thread",
+                           multiprocess_mode="livesum")
+bcrypt_duration = Histogram("bcrypt_duration_seconds", "Time of a bcrypt operation, including the wait for a thread",
+                            ["operation"], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+# outbound calls (email API, cloudinary, s3)
+outbound_attempt_duration = Histogram("outbound_attempt_duration_seconds", "Time of one attempt at an outbound call",
+                                      ["provider", "outcome"], buckets=latency_buckets)
+outbound_calls = Counter("outbound_calls_total", "Outbound calls by final result", ["provider", "result"])
+outbound_retries = Counter("outbound_retries_total", "Retried outbound attempts", ["provider"])
+outbound_circuit_open = Gauge("outbound_circuit_open", "1 while a worker has the provider's circuit open",
+                              ["provider"], multiprocess_mode="livemax")
+
+# logging
+log_records_dropped = Gauge("log_records_dropped", "Log records dropped because the log queue was full",
+                            multiprocess_mode="livesum")
+
+# event loop
+event_loop_lag = Histogram("event_loop_lag_seconds", "How late the event loop woke up a sleeping task",
+                           buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+
+
+def render() -> bytes:
+    """Returns the metrics of every worker in the Prometheus text format"""
+    if multiprocess_dir:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def export_logging_metrics():
+    """Copies the number of log records this worker dropped to the metrics gauge"""
+    log_records_dropped.set(get_dropped_records())
+
+
+async def sample_runtime(interval: float, samplers: list):
+    """
+    Refreshes the gauges of this worker with the given functions and
+    measures event-loop lag every interval seconds, until cancelled
+    """
+    while True:
+        started_at = time.perf_counter()
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(0.0, time.perf_counter() - started_at - interval))
+        for sampler in samplers:
+            try:
+                sampler()
+            except Exception:
+                logger.exception("Metrics sampler %s failed", sampler.__name__)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+Counts and times the SQL statements, Redis commands, outbound HTTP calls,
+bcrypt work and response rendering of each request, and reports them in
+a Server-Timing header, e.g.
+
+    Server-Timing: db;dur=4.1;desc="3", cache;dur=0.8;desc="2", render;dur=0.2;desc="1", total;dur=9.7
+
+`desc` carries the number of calls, which tests/query_budget.py asserts.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi.responses import ORJSONResponse
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+
+class RequestTimings:
+    """Call counts and durations (ms) of one request, per kind of work"""
+
+    kinds = ("db", "cache", "http", "bcrypt", "render")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.counts = {kind: 0 for kind in self.kinds}
+        self.durations = {kind: 0.0 for kind in self.kinds}
+
+    def record(self, kind: str, elapsed_ms: float, count: int = 1):
+        self.counts[kind] += count
+        self.durations[kind] += elapsed_ms
+
+    def server_timing(self) -> str:
+        """Formats the timings as a Server-Timing header value"""
+        metrics = [f'{kind};dur={self.durations[kind]:.1f};desc="{self.counts[kind]}"'
+                   for kind in self.kinds if self.counts[kind]]
+        metrics.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+# Timings of the request being served, set by the middleware in app.main
+request_timings: ContextVar[RequestTimings] = ContextVar("request_timings", default=None)
+
+
+def record(kind: str, elapsed_ms: float, count: int = 1):
+    """Adds work to the current request's timings, if there is a request"""
+    timings = request_timings.get()
+    if timings is not None:
+        timings.record(kind, elapsed_ms, count)
+
+
+@contextmanager
+def timed(kind: str):
+    """Times the block as one call of the given kind"""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, (time.perf_counter() - started_at) * 1000)
+
+
+class TimedPipeline(Pipeline):
+    """Redis pipeline counting every queued command, timed as one round trip"""
+
+    async def execute(self, raise_on_error: bool = True):
+        count = len(self.command_stack)
+        started_at = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            record("cache", (time.perf_counter() - started_at) * 1000, count)
+
+
+class TimedRedis(Redis):
+    """Redis client counting and timing every command"""
+
+    async def execute_command(self, *args, **options):
+        started_at = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            record("cache", (time.perf_counter() - started_at) * 1000)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> TimedPipeline:
+        return TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class TimedJSONResponse(ORJSONResponse):
+    """JSON response encoded with orjson, timing its rendering"""
+
+    def render(self, content) -> bytes:
+        with timed("render"):
+            return super().render(content)
+
+
+def record_http_response(response, *args, **kwargs):
+    """requests response hook recording an outbound HTTP call"""
+    record("http", response.elapsed.total_seconds() * 1000)
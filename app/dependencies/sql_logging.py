@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+"""
+Times every SQL statement through engine events. Statements slower than
+SQL_SLOW_QUERY_MS are logged with the shape of their bound parameters
+(never the values) and the route that ran them, a SQL_LOG_SAMPLE_RATE
+fraction of the rest is logged too, and per-statement totals are kept
+for the /stats/sql endpoint.
+"""
+
+import re
+import time
+import random
+import logging
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config.settings import get_settings
+from app.dependencies.request_timing import record
+
+
+settings = get_settings()
+
+slow_query_ms = settings.sql_slow_query_ms
+sample_rate = settings.sql_log_sample_rate
+max_statements = settings.sql_stats_max_statements
+
+logger = logging.getLogger("app.sql")
+
+# Route of the request being served, set by the middleware in app.main
+current_route: ContextVar[str] = ContextVar("current_route", default="-")
+
+statement_stats: dict = {}
+
+# Collapses expanded IN lists so they aggregate as a single statement
+in_list = re.compile(r"\(\s*(?:\$\d+|%\(\w+\)s|\?)(?:\s*,\s*(?:\$\d+|%\(\w+\)s|\?))+\s*\)")
+
+
+def normalize_statement(statement: str) -> str:
+    """Returns the statement with whitespace and IN lists collapsed"""
+    return in_list.sub("(...)", " ".join(statement.split()))
+
+
+def parameter_shape(parameters, executemany: bool) -> str:
+    """Describes the types of bound parameters without their values"""
+    if executemany:
+        rows = list(parameters)
+        first = parameter_shape(rows[0], False) if rows else "()"
+        return f"{len(rows)} x {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def record_statement(statement: str, elapsed_ms: float):
+    """Adds one execution of a statement to the aggregate statistics"""
+    stats = statement_stats.get(statement)
+    if stats is None:
+        if len(statement_stats) >= max_statements:
+            return
+        stats = statement_stats[statement] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0}
+    stats["calls"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+
+def get_statement_stats(limit: int = 50) -> list:
+    """Returns the statements that took the most total time"""
+    ranked = sorted(statement_stats.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    return [{
+        "statement": statement,
+        "calls": stats["calls"],
+        "total_ms": round(stats["total_ms"], 3),
+        "mean_ms": round(stats["total_ms"] / stats["calls"], 3),
+        "max_ms": round(stats["max_ms"], 3),
+    } for statement, stats in ranked[:limit]]
+
+
+def reset_statement_stats():
+    """Clears the aggregate statistics"""
+    statement_stats.clear()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started_at = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context._query_started_at) * 1000
+    record("db", elapsed_ms)
+    normalized = normalize_statement(statement)
+    record_statement(normalized, elapsed_ms)
+    if elapsed_ms >= slow_query_ms:
+        logger.warning("slow query %.1fms route=%s params=%s sql=%s", elapsed_ms,
+                       current_route.get(), parameter_shape(parameters, executemany), normalized)
+    elif sample_rate and random.random() < sample_rate:
+        logger.info("query %.1fms route=%s params=%s sql=%s", elapsed_ms,
+                    current_route.get(), parameter_shape(parameters, executemany), normalized)
+
+
+def install_sql_logging(engine: Engine):
+    """Attaches the timing hooks to an engine (pass async_engine.sync_engine for async engines)"""
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
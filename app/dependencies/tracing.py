@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+OpenTelemetry tracing of the app. A traced request has a span for the
+route handler and, under it, spans for every SQL statement, Redis command,
+bcrypt operation, email sent and outbound call attempt (email API,
+cloudinary, s3), so the slow part of a request shows up directly.
+
+    TRACING_EXPORTER=none       none/file/otlp
+    TRACING_SAMPLE_RATIO=0.1    share of new traces recorded, callers' sampling decisions are kept
+    TRACING_FILE_DIR=...        file exporter: one JSON lines file per process
+    TRACING_OTLP_ENDPOINT=...   otlp exporter: collector traces url, OTEL_EXPORTER_OTLP_* otherwise
+
+With TRACING_EXPORTER=none nothing is recorded, the instrumentations are
+not even imported and the spans of the app are no-ops.
+"""
+
+import os
+from opentelemetry import trace
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from app.config.settings import get_settings
+
+
+settings = get_settings()
+
+tracer = trace.get_tracer("ouul")
+
+tracer_provider = None
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends finished spans as JSON lines to a file of the process, for analysis offline"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans) -> SpanExportResult:
+        # Runs on the batch processor's thread, off the event loop
+        path = os.path.join(self.directory, f"traces-{os.getpid()}.jsonl")
+        try:
+            with open(path, "a") as output:
+                for span in spans:
+                    output.write(span.to_json(indent=None) + "\n")
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+
+def span_exporter() -> SpanExporter:
+    if settings.tracing_exporter == "file":
+        return FileSpanExporter(settings.tracing_file_dir)
+    if settings.tracing_exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+    raise ValueError(f"Unknown TRACING_EXPORTER '{settings.tracing_exporter}'")
+
+
+def configure_tracing(app, engines: list):
+    """
+    Starts recording traces of the app, its database engines (pass
+    async_engine.sync_engine for async engines) and redis. Call it once
+    all middleware has been added, the request span has to be the outermost.
+    """
+    global tracer_provider
+    if settings.tracing_exporter == "none" or tracer_provider is not None:
+        return
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    from opentelemetry.instrumentation.redis import RedisInstrumentor
+    from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
+    tracer_provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.tracing_service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+    )
+    # The batch processor exports from a thread of its own, restarted in every forked worker
+    tracer_provider.add_span_processor(BatchSpanProcessor(span_exporter()))
+    trace.set_tracer_provider(tracer_provider)
+
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=tracer_provider, excluded_urls="/metrics")
+    SQLAlchemyInstrumentor().instrument(engines=engines, tracer_provider=tracer_provider)
+    RedisInstrumentor().instrument(tracer_provider=tracer_provider)
+
+
+def flush_tracing():
+    """Exports the spans still buffered"""
+    if tracer_provider is not None:
+        tracer_provider.force_flush()
@@ -2,11 +2,58 @@
 
 """Main module for the ouul app"""
 
-from fastapi import FastAPI
+import re
+import time
+import asyncio
+import logging
+from uuid import uuid4
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import auth, admins, blogs, users
+from opentelemetry import trace
+from .config.settings import get_settings
+from .config.logging_config import configure_logging, request_id
+from .dependencies import metrics
+from .dependencies.cache import create_cache_pool, warm_cache_pool, close_cache_pool, export_cache_metrics
+from .dependencies.database import engine, replicas, warm_db_pools, close_db_pools
+from .dependencies.db_pool import export_pool_metrics
+from .dependencies.sql_logging import current_route
+from .dependencies.request_timing import RequestTimings, TimedJSONResponse, request_timings
+from .dependencies.tracing import configure_tracing, flush_tracing
+from .utils.resilience import export_circuit_metrics
+from .routers import auth, admins, blogs, users, stats, uploads
+from .routers import metrics as metrics_router
 
-app = FastAPI()
+
+settings = get_settings()
+
+configure_logging()
+
+access_logger = logging.getLogger("app.access")
+
+# Request ids accepted from the client or the proxy in front of the app
+valid_request_id = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Creates and pre-warms the shared connection pools and starts sampling
+    the runtime metrics on startup, stops and closes them on shutdown
+    """
+    create_cache_pool()
+    await warm_cache_pool(settings.redis_pool_prewarm)
+    await warm_db_pools(settings.db_pool_prewarm)
+    sampler = asyncio.create_task(metrics.sample_runtime(
+        settings.metrics_sample_interval, [export_pool_metrics, export_cache_metrics, export_circuit_metrics, metrics.export_logging_metrics]))
+    yield
+    sampler.cancel()
+    await close_cache_pool()
+    await close_db_pools()
+    flush_tracing()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=TimedJSONResponse)
 
 origins = [
     "*",
@@ -20,6 +67,61 @@ app.include_router(auth.router)
 app.include_router(admins.router)
 app.include_router(blogs.router)
 app.include_router(users.router)
+app.include_router(stats.router)
+app.include_router(uploads.router)
+app.include_router(metrics_router.router)
+
+
+@app.middleware("http")
+async def tag_route(request: Request, call_next):
+    """Records the route being served so slow queries can be traced back to it"""
+    current_route.set(f"{request.method} {request.url.path}")
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """Reports the queries, cache commands and other work of the request in a Server-Timing header"""
+    timings = RequestTimings()
+    request_timings.set(timings)
+    response = await call_next(request)
+    response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """Counts and times every request by its route template, e.g. /users/{id}"""
+    started_at = time.perf_counter()
+    metrics.requests_in_progress.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.requests_in_progress.dec()
+        # Set by the router on the scope once a route matched, raw paths would explode the label set
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        elapsed = time.perf_counter() - started_at
+        metrics.request_duration.labels(request.method, path).observe(elapsed)
+        metrics.requests_total.labels(request.method, path, str(status)).inc()
+        access_logger.info("%s %s %s", request.method, path, status,
+                           extra={"status": status, "duration_ms": round(elapsed * 1000, 1)})
+
+
+@app.middleware("http")
+async def tag_request_id(request: Request, call_next):
+    """Tags the logs of a request with its X-Request-ID, generated when missing, and echoes it back"""
+    incoming = request.headers.get("x-request-id", "")
+    request_id.set(incoming if valid_request_id.match(incoming) else uuid4().hex)
+    # Lets the trace of a request be found from its logs and the other way round
+    trace.get_current_span().set_attribute("request.id", request_id.get())
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id.get()
+    return response
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,3 +130,6 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+# After all middleware, so the request span covers them
+configure_tracing(app, [engine.sync_engine] + [replica.engine.sync_engine for replica in replicas])
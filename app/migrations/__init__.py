@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+"""
+Versioned schema migrations driven by the metadata in app/models.
+
+Every module in app/migrations/versions defines:
+
+    version        unique, increasing integer
+    description    one line summary shown by the planner
+    transactional  False when the migration runs statements that cannot run
+                   inside a transaction (CREATE INDEX CONCURRENTLY, batched
+                   backfills); each statement then commits on its own
+    upgrade(ctx)   applies the migration through a MigrationContext
+    tables         optional, the existing tables the migration changes; a dry
+                   run skips it when they are all created earlier in the
+                   plan, from the current models that already include it
+
+Applied versions are recorded in the schema_migrations table.
+"""
+
+import time
+import pkgutil
+import importlib
+from contextlib import contextmanager
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.migrations import versions
+from app.config.settings import get_settings
+
+
+settings = get_settings()
+
+lock_timeout = settings.migration_lock_timeout
+batch_size = settings.migration_batch_size
+batch_pause = settings.migration_batch_pause
+
+
+class MigrationError(Exception):
+    """The data does not allow a migration to run, it is aborted before changing anything"""
+
+
+class MigrationContext:
+    """Runs (or, on a dry run, records) the statements of a single migration"""
+
+    def __init__(self, connection: Connection, dry_run: bool = False, created_tables: set = None):
+        self.connection = connection
+        self.dry_run = dry_run
+        self.statements = []
+        # Tables created by this and earlier migrations of the plan, they don't exist yet on a dry run
+        self.created_tables = set() if created_tables is None else created_tables
+
+    def execute(self, sql: str, params: dict = None):
+        """Executes a statement, or only records it on a dry run"""
+        self.statements.append(sql)
+        if not self.dry_run:
+            return self.connection.execute(text(sql), params or {})
+
+    def scalar(self, sql: str, params: dict = None):
+        """Runs a read-only query, also on a dry run, and returns the first column"""
+        return self.connection.execute(text(sql), params or {}).scalar()
+
+    def column_type(self, table: str, column: str) -> str:
+        """Returns the data type of a column or None if it does not exist"""
+        return self.scalar("SELECT data_type FROM information_schema.columns "
+                           "WHERE table_schema = current_schema() "
+                           "AND table_name = :table AND column_name = :column",
+                           {"table": table, "column": column})
+
+    def duplicates(self, table: str, expression: str) -> list:
+        """Returns the values of expression shared by several rows of table, each with the ids of those rows"""
+        rows = self.connection.execute(text(f"SELECT {expression}, array_agg(id::text ORDER BY id::text) "
+                                            f"FROM {table} GROUP BY 1 HAVING count(*) > 1 ORDER BY 1")).all()
+        return [(value, ids) for value, ids in rows]
+
+    def create_all(self, metadata: MetaData):
+        """Creates the tables (and their indexes) of metadata that do not exist yet"""
+        existing = set(inspect(self.connection).get_table_names()) | self.created_tables
+        for table in metadata.sorted_tables:
+            if table.name in existing:
+                continue
+            self.created_tables.add(table.name)
+            self.statements.append(str(CreateTable(table).compile(self.connection)).strip())
+            for index in table.indexes:
+                self.statements.append(str(CreateIndex(index).compile(self.connection)))
+        if not self.dry_run:
+            metadata.create_all(self.connection)
+
+    def create_index_concurrently(self, name: str, table: str, expression: str, unique: bool = False):
+        """
+        Builds an index without locking the table against writes.
+        An invalid index left behind by an interrupted build is dropped and rebuilt.
+        """
+        valid = self.scalar("SELECT i.indisvalid FROM pg_index i "
+                            "JOIN pg_class c ON c.oid = i.indexrelid "
+                            "WHERE c.relname = :name", {"name": name})
+        if valid:
+            return
+        if valid is not None:
+            self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        unique_sql = "UNIQUE " if unique else ""
+        self.execute(f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({expression})")
+
+    def drop_index_concurrently(self, name: str):
+        """Drops an index without locking the table against writes"""
+        self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+    def backfill(self, table: str, assignment: str, condition: str,
+                 size: int = None, pause: float = None) -> int:
+        """
+        Applies `UPDATE table SET assignment` to the rows matching condition,
+        one committed batch at a time with a pause in between, so no batch
+        holds row locks for long. Rows locked by other transactions are
+        skipped and retried until none match. Returns the number of rows updated.
+        """
+        size = size or batch_size
+        pause = batch_pause if pause is None else pause
+        sql = (f"UPDATE {table} SET {assignment} WHERE id IN ("
+               f"SELECT id FROM {table} WHERE {condition} LIMIT {size} FOR UPDATE SKIP LOCKED)")
+        if self.dry_run:
+            try:
+                pending = self.scalar(f"SELECT count(*) FROM {table} WHERE {condition}")
+            except DBAPIError:
+                # The condition refers to a column added earlier in the same migration
+                pending = "all matching"
+            self.statements.append(f"{sql}  -- {pending} rows in batches of {size}")
+            return pending
+        self.statements.append(sql)
+        total = 0
+        while True:
+            updated = self.connection.execute(text(sql)).rowcount
+            total += updated
+            if updated < size and not self.scalar(f"SELECT EXISTS (SELECT 1 FROM {table} WHERE {condition})"):
+                return total
+            time.sleep(pause)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs the statements issued inside the block as one transaction,
+        for the short locking steps of a non-transactional migration
+        """
+        self.statements.append("BEGIN")
+        if self.dry_run:
+            yield
+        else:
+            # The connection is in autocommit mode, the block runs in a real transaction
+            self.connection.commit()
+            self.connection.execution_options(isolation_level=self.connection.default_isolation_level)
+            try:
+                with self.connection.begin():
+                    yield
+            finally:
+                self.connection.execution_options(isolation_level="AUTOCOMMIT")
+        self.statements.append("COMMIT")
+
+
+def load_migrations() -> list:
+    """Imports every migration module ordered by version"""
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        migrations.append(importlib.import_module(f"{versions.__name__}.{module_info.name}"))
+    migrations.sort(key=lambda migration: migration.version)
+    seen = set()
+    for migration in migrations:
+        if migration.version in seen:
+            raise ValueError(f"Duplicate migration version {migration.version}")
+        seen.add(migration.version)
+    return migrations
+
+
+def ensure_migrations_table(connection: Connection):
+    """Creates the schema_migrations table if it does not exist"""
+    connection.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations ("
+                            "version INTEGER PRIMARY KEY, "
+                            "description VARCHAR NOT NULL, "
+                            "applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"))
+
+
+def applied_versions(connection: Connection) -> set:
+    """Returns the versions recorded in the schema_migrations table"""
+    if connection.execute(text("SELECT to_regclass('schema_migrations')")).scalar() is None:
+        return set()
+    return set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def pending_migrations(engine: Engine, target: int = None) -> list:
+    """Returns the migrations that still need to run, up to target if given"""
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+    return [migration for migration in load_migrations()
+            if migration.version not in applied
+            and (target is None or migration.version <= target)]
+
+
+def run_migration(engine: Engine, migration, dry_run: bool = False, created_tables: set = None) -> list:
+    """Runs a single migration and returns the statements it issued"""
+    if migration.transactional and not dry_run:
+        with engine.begin() as connection:
+            connection.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+            ctx = MigrationContext(connection, created_tables=created_tables)
+            migration.upgrade(ctx)
+            connection.execute(text("INSERT INTO schema_migrations (version, description) "
+                                    "VALUES (:version, :description)"),
+                               {"version": migration.version, "description": migration.description})
+        return ctx.statements
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"SET lock_timeout = '{lock_timeout}'"))
+        ctx = MigrationContext(connection, dry_run=dry_run, created_tables=created_tables)
+        migration.upgrade(ctx)
+        if not dry_run:
+            connection.execute(text("INSERT INTO schema_migrations (version, description) "
+                                    "VALUES (:version, :description)"),
+                               {"version": migration.version, "description": migration.description})
+    return ctx.statements
+
+
+def run_migrations(engine: Engine, target: int = None, dry_run: bool = False) -> list:
+    """
+    Runs every pending migration in order. On a dry run nothing is written
+    and the returned plan lists the statements each migration would issue.
+    """
+    if not dry_run:
+        with engine.begin() as connection:
+            ensure_migrations_table(connection)
+    plan = []
+    created_tables = set()
+    for migration in pending_migrations(engine, target):
+        tables = set(getattr(migration, "tables", ()))
+        if dry_run and tables and tables <= created_tables:
+            statements = [f"-- skipped, its tables are created earlier in this plan: {', '.join(sorted(tables))}"]
+        else:
+            statements = run_migration(engine, migration, dry_run, created_tables)
+        plan.append({
+            "version": migration.version,
+            "description": migration.description,
+            "statements": statements
+        })
+    return plan
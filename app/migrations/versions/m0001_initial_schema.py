@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+
+"""Creates the admins, blogs and users tables from the app models"""
+
+from app.models.models import Base
+from app.models import admins, blogs, users
+
+
+version = 1
+description = "Create the admins, blogs and users tables"
+transactional = True
+
+
+def upgrade(ctx):
+    ctx.create_all(Base.metadata)
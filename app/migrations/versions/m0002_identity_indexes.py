@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+
+"""Normalizes stored identities and indexes the lower-cased lookups"""
+
+from app.migrations import MigrationError
+
+
+version = 2
+description = "Lower-case stored emails and usernames and index lower(email)/lower(username)"
+transactional = False
+tables = ("users", "admins")
+
+identities = (("users", "email"), ("admins", "email"), ("admins", "username"))
+
+
+def upgrade(ctx):
+    # Case variants of one identity would break the backfill on the unique
+    # constraints, and leave an invalid index behind, so nothing runs until
+    # they are merged or renamed
+    conflicts = [f"{table}.{column} '{value}': ids {', '.join(ids)}"
+                 for table, column in identities
+                 for value, ids in ctx.duplicates(table, f"lower(trim({column}))")]
+    if conflicts:
+        raise MigrationError("These rows only differ in case or whitespace, resolve them and migrate again:\n  "
+                             + "\n  ".join(conflicts))
+
+    for table, column in identities:
+        ctx.backfill(table, f"{column} = lower(trim({column}))", f"{column} <> lower(trim({column}))")
+    ctx.create_index_concurrently("ix_users_email_lower", "users", "lower(email)", unique=True)
+    ctx.create_index_concurrently("ix_admins_email_lower", "admins", "lower(email)", unique=True)
+    ctx.create_index_concurrently("ix_admins_username_lower", "admins", "lower(username)", unique=True)
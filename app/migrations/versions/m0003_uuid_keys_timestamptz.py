@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+"""
+Moves ids and blogs.author_id from varchar to native uuid and the
+timestamps to timestamptz with server-side defaults.
+
+The uuid columns are added next to the old ones, kept in sync for new
+rows by triggers, backfilled in batches and indexed concurrently. Only
+the final swap takes table locks, in one short transaction: the NOT NULL
+checks are validated beforehand, the primary keys reuse the prebuilt
+unique indexes, and with the session time zone set to UTC the
+timestamp -> timestamptz change needs no table rewrite (PostgreSQL 12+).
+Existing timestamps are read as UTC.
+"""
+
+
+version = 3
+description = "Native uuid keys, timestamptz and server-side defaults"
+transactional = False
+
+tables = ("admins", "users", "blogs")
+
+
+def upgrade(ctx):
+    if ctx.column_type("admins", "id") == "uuid":
+        # Databases created from the current models already have this schema
+        return
+
+    ctx.execute("CREATE OR REPLACE FUNCTION sync_new_id() RETURNS trigger AS $$ "
+                "BEGIN NEW.new_id := NEW.id::uuid; RETURN NEW; END $$ LANGUAGE plpgsql")
+    ctx.execute("CREATE OR REPLACE FUNCTION sync_new_author_id() RETURNS trigger AS $$ "
+                "BEGIN NEW.new_author_id := NEW.author_id::uuid; RETURN NEW; END $$ LANGUAGE plpgsql")
+    for table in tables:
+        ctx.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS new_id uuid")
+        ctx.execute(f"DROP TRIGGER IF EXISTS {table}_sync_new_id ON {table}")
+        ctx.execute(f"CREATE TRIGGER {table}_sync_new_id BEFORE INSERT OR UPDATE OF id ON {table} "
+                    "FOR EACH ROW EXECUTE FUNCTION sync_new_id()")
+    ctx.execute("ALTER TABLE blogs ADD COLUMN IF NOT EXISTS new_author_id uuid")
+    ctx.execute("DROP TRIGGER IF EXISTS blogs_sync_new_author_id ON blogs")
+    ctx.execute("CREATE TRIGGER blogs_sync_new_author_id BEFORE INSERT OR UPDATE OF author_id ON blogs "
+                "FOR EACH ROW EXECUTE FUNCTION sync_new_author_id()")
+
+    for table in tables:
+        ctx.backfill(table, "new_id = id::uuid", "new_id IS NULL")
+    ctx.backfill("blogs", "new_author_id = author_id::uuid", "new_author_id IS NULL")
+
+    for table in tables:
+        ctx.create_index_concurrently(f"{table}_new_id_key", table, "new_id", unique=True)
+        # A validated check lets SET NOT NULL skip its full table scan inside the swap
+        ctx.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_new_id_not_null")
+        ctx.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_new_id_not_null "
+                    "CHECK (new_id IS NOT NULL) NOT VALID")
+        ctx.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_new_id_not_null")
+    ctx.create_index_concurrently("ix_blogs_author_id", "blogs", "new_author_id")
+    ctx.execute("ALTER TABLE blogs DROP CONSTRAINT IF EXISTS blogs_new_author_id_not_null")
+    ctx.execute("ALTER TABLE blogs ADD CONSTRAINT blogs_new_author_id_not_null "
+                "CHECK (new_author_id IS NOT NULL) NOT VALID")
+    ctx.execute("ALTER TABLE blogs VALIDATE CONSTRAINT blogs_new_author_id_not_null")
+
+    with ctx.transaction():
+        ctx.execute("SET LOCAL timezone = 'UTC'")
+        ctx.execute("ALTER TABLE blogs DROP CONSTRAINT IF EXISTS blogs_author_id_fkey")
+        ctx.execute("DROP TRIGGER blogs_sync_new_author_id ON blogs")
+        ctx.execute("ALTER TABLE blogs DROP COLUMN author_id")
+        ctx.execute("ALTER TABLE blogs RENAME COLUMN new_author_id TO author_id")
+        ctx.execute("ALTER TABLE blogs ALTER COLUMN author_id SET NOT NULL")
+        ctx.execute("ALTER TABLE blogs DROP CONSTRAINT blogs_new_author_id_not_null")
+        for table in tables:
+            # Dropping the old id also drops its primary key and ix_<table>_id index
+            ctx.execute(f"DROP TRIGGER {table}_sync_new_id ON {table}")
+            ctx.execute(f"ALTER TABLE {table} DROP COLUMN id")
+            ctx.execute(f"ALTER TABLE {table} RENAME COLUMN new_id TO id")
+            ctx.execute(f"ALTER TABLE {table} ALTER COLUMN id SET NOT NULL")
+            ctx.execute(f"ALTER TABLE {table} DROP CONSTRAINT {table}_new_id_not_null")
+            ctx.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY USING INDEX {table}_new_id_key")
+            ctx.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT gen_random_uuid(), "
+                        "ALTER COLUMN created_at TYPE timestamptz, "
+                        "ALTER COLUMN created_at SET DEFAULT now(), "
+                        "ALTER COLUMN updated_at TYPE timestamptz, "
+                        "ALTER COLUMN updated_at SET DEFAULT now()")
+        ctx.execute("ALTER TABLE admins ALTER COLUMN last_login TYPE timestamptz, "
+                    "ALTER COLUMN last_login SET DEFAULT now()")
+        ctx.execute("ALTER TABLE blogs ADD CONSTRAINT blogs_author_id_fkey "
+                    "FOREIGN KEY (author_id) REFERENCES admins (id) NOT VALID")
+        ctx.execute("DROP FUNCTION sync_new_id()")
+        ctx.execute("DROP FUNCTION sync_new_author_id()")
+
+    # Checks the existing rows without blocking writes
+    ctx.execute("ALTER TABLE blogs VALIDATE CONSTRAINT blogs_author_id_fkey")
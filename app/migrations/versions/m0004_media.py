@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+
+"""Creates the media table for direct-to-storage uploads"""
+
+from app.models.models import Base
+from app.models import media
+
+
+version = 4
+description = "Create the media table"
+transactional = True
+
+
+def upgrade(ctx):
+    ctx.create_all(Base.metadata)
@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+
+"""Adds the content hash of uploaded media, for deduplicating uploads"""
+
+
+version = 5
+description = "Add media.sha256 and index it"
+transactional = False
+tables = ("media",)
+
+
+def upgrade(ctx):
+    # Adding a nullable column without a default only touches the catalog
+    ctx.execute("ALTER TABLE media ADD COLUMN IF NOT EXISTS sha256 varchar(64)")
+    ctx.create_index_concurrently("ix_media_sha256", "media", "sha256")
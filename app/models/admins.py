@@ -5,9 +5,9 @@
 import enum
 from typing import List
 from datetime import datetime
-from app.models.models import Base, Basemodel, Response
-from pydantic import BaseModel, EmailStr, UUID4
-from sqlalchemy import Column, DateTime, String, Boolean, Enum, JSON
+from app.models.models import Base, Basemodel, Response, normalize_identity
+from pydantic import BaseModel, EmailStr, UUID4, field_validator
+from sqlalchemy import Column, DateTime, String, Boolean, Enum, JSON, Index, func
 from sqlalchemy.orm import relationship
 
 class AdminRole(str, enum.Enum):
@@ -27,11 +27,16 @@ class Admin(Basemodel, Base):
     email = Column(String, nullable=False) # Admin's email address
     password = Column(String, nullable=False) # Admin's hashed password.
     is_active = Column(Boolean, nullable=True, default=True) # Admin's account status (active/inactive)
-    last_login = Column(DateTime, default=datetime.now) # Last time admin was active
+    last_login = Column(DateTime(timezone=True), server_default=func.now()) # Last time admin was active
     role = Column(Enum(AdminRole), nullable=False, default="user") # Admin's role (editor/admin)
     permissions = Column(JSON, nullable=False, default="{}")
     blogs = relationship("Blog", back_populates="admins")
 
+    __table_args__ = (
+        # Emails and usernames are stored lower-cased, lookups probe these indexes
+        Index("ix_admins_email_lower", func.lower(email), unique=True),
+        Index("ix_admins_username_lower", func.lower(username), unique=True),
+    )
 
     def __init__(self, **kwargs):
         """Initialize user data model"""
@@ -49,6 +54,12 @@ class AdminSignupSchema(BaseModel):
     role: AdminRole # Admin's role (manager/admin/supervisor/user)
     permissions: dict # Admin's permissions (create/read/update/delete)
 
+    @field_validator("username", "email")
+    @classmethod
+    def normalize_identities(cls, value: str) -> str:
+        """Store and look up usernames and emails in a single case"""
+        return normalize_identity(value)
+
 class AdminResponseSchema(BaseModel):
     id: UUID4 # Admin's unique identifier
     created_at: datetime # Admin's creation date
@@ -7,7 +7,7 @@ import enum
 from datetime import datetime
 from app.models.models import Base, Basemodel, Response
 from pydantic import BaseModel, UUID4
-from sqlalchemy import Column, ForeignKey, String, ARRAY, Enum
+from sqlalchemy import Column, ForeignKey, String, ARRAY, Enum, Uuid
 from sqlalchemy.orm import relationship
 from typing import List
 
@@ -22,7 +22,7 @@ class Blog(Basemodel, Base):
     """Blog data model"""
     __tablename__ = "blogs"
 
-    author_id = Column(String, ForeignKey('admins.id'), nullable=False) # id of the admin that created the blog (author)
+    author_id = Column(Uuid(as_uuid=False), ForeignKey('admins.id'), nullable=False, index=True) # id of the admin that created the blog (author)
     author = Column(String, nullable=False) # username of author
     title = Column(String, nullable=False) # blog title
     content = Column(String, nullable=False) # blog content
@@ -44,10 +44,10 @@ class BlogUpdateSchema(BaseModel):
     tags: List[str] # blog tags
 
 class BlogResponseSchema(BaseModel):
-    id: str
+    id: UUID4
     created_at: datetime
     updated_at: datetime
-    author_id: str
+    author_id: UUID4
     author: str
     title: str
     content: str
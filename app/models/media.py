@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+"""module for defining the data model of uploaded media files"""
+
+import enum
+from typing import Dict
+from datetime import datetime
+from app.models.models import Base, Basemodel, Response
+from pydantic import BaseModel, UUID4
+from sqlalchemy import BigInteger, Column, Enum, String, Uuid
+
+class MediaProvider(str, enum.Enum):
+    """Enum class defining the storage services media can be uploaded to"""
+    s3 = "s3"
+    cloudinary = "cloudinary"
+
+class MediaStatus(str, enum.Enum):
+    """Enum class defining the possible values for a media upload status"""
+    pending = "pending"
+    uploaded = "uploaded"
+
+
+class Media(Basemodel, Base):
+    """Media data model"""
+    __tablename__ = "media"
+
+    owner_id = Column(Uuid(as_uuid=False), nullable=False, index=True) # id of the admin that uploaded the file
+    provider = Column(Enum(MediaProvider), nullable=False) # storage service holding the file
+    key = Column(String, nullable=False) # s3 object key or cloudinary public id
+    filename = Column(String, nullable=False) # original filename
+    content_type = Column(String, nullable=False) # declared mime type
+    size = Column(BigInteger, nullable=True) # size in bytes, known once uploaded
+    url = Column(String, nullable=True) # url of the uploaded file
+    status = Column(Enum(MediaStatus), nullable=False, default="pending") # upload status
+    sha256 = Column(String(64), nullable=True, index=True) # hex digest of the content, known for files uploaded through the api
+
+
+class UploadRequestSchema(BaseModel):
+    filename: str # name of the file to upload
+    content_type: str # mime type of the file (image/jpeg or video/mp4)
+    size: int # size of the file in bytes
+
+class UploadTicketSchema(BaseModel):
+    media_id: UUID4 # id to complete the upload with
+    provider: MediaProvider # storage service to upload to
+    url: str # url to POST the file to
+    fields: Dict[str, str] # form fields to send along with the file
+    expires_at: datetime # the upload must start before this time
+
+class UploadTicketResponse(Response):
+    data: UploadTicketSchema
+
+class MediaResponseSchema(BaseModel):
+    id: UUID4 # media's unique identifier
+    created_at: datetime # media's creation date
+    updated_at: datetime # media's update date
+    owner_id: UUID4 # id of the admin that uploaded the file
+    provider: MediaProvider # storage service holding the file
+    filename: str # original filename
+    content_type: str # mime type
+    size: int # size in bytes
+    url: str # url of the uploaded file
+    status: MediaStatus # upload status
+
+class MediaResponse(Response):
+    data: MediaResponseSchema
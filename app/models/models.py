@@ -1,36 +1,37 @@
 #!/usr/bin/env python3
 
-from datetime import datetime
 from pydantic import BaseModel
-from sqlalchemy import Column, DateTime, String
-from sqlalchemy.orm import Session
+from sqlalchemy import Column, DateTime, Uuid, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from uuid import uuid4
 
 Base = declarative_base()
 
-def create_uuid4_string() -> str:
-    "Create a uuid4 and return it as string "
-    return str(uuid4())
+def normalize_identity(value: str) -> str:
+    "Normalize an email address or username for storage and lookups"
+    return value.strip().lower()
 
 class Basemodel:
     """Basemodel for other database tables to inherit"""
     __abstract__ = True
 
-    id = Column(String(60), index=True, primary_key=True, default=create_uuid4_string) # object's unique id
-    created_at = Column(DateTime, default=datetime.now) # object's creation date
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now) # object's update date
+    # ids and timestamps are generated by postgres (gen_random_uuid() needs PostgreSQL 13+)
+    id = Column(Uuid(as_uuid=False), primary_key=True, server_default=func.gen_random_uuid()) # object's unique id
+    created_at = Column(DateTime(timezone=True), server_default=func.now()) # object's creation date
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now()) # object's update date
+
+    # Read the generated id and timestamps back with RETURNING on insert and update
+    __mapper_args__ = {"eager_defaults": True}
 
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
             if key != '__class__':
                 setattr(self, key, value)
     
-    def save(self, session: Session):
+    async def save(self, session: AsyncSession):
         """Save object to database"""
-        self.updated_at = datetime.now()
         session.add(self)
-        session.commit()
+        await session.commit()
     
     def to_dict(self):
         """returns a dictionary containing all keys/values of the instance"""
@@ -43,13 +44,12 @@ class Basemodel:
             del new_dict["_sa_instance_state"]
         return new_dict
 
-    def update(self, session: Session, **kwargs):
+    async def update(self, session: AsyncSession, **kwargs):
         """Update object in database"""
         for key, value in kwargs.items():
             if key != '__class__' and key != 'id' and key != 'created_at'and key != 'author_id' and key != 'author':
                 setattr(self, key, value)
-        self.updated_at = datetime.now()
-        session.commit()
+        await session.commit()
 
 class Response(BaseModel):
     success: bool # response status
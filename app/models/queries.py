@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+"""
+Pre-built statements for the hot lookups. They are constructed once at
+import time with bound parameters, so a request only supplies the values
+(`await db.scalar(queries.user_by_email, {"email": email})`) instead of
+rebuilding the select, and SQLAlchemy reuses the cached compiled SQL.
+"""
+
+from app.models.admins import Admin, AdminResponseSchema
+from app.models.blogs import Blog, BlogResponseSchema
+from app.models.media import Media
+from app.models.users import User
+from sqlalchemy import bindparam, func, select
+
+
+admin_by_id = select(Admin).where(Admin.id == bindparam("id"))
+admin_by_email = select(Admin).where(func.lower(Admin.email) == bindparam("email"))
+admin_by_username = select(Admin).where(func.lower(Admin.username) == bindparam("username"))
+# Only the response columns, as tuples, for list endpoints
+admin_rows = select(*[Admin.__table__.c[name] for name in AdminResponseSchema.model_fields])
+
+user_by_id = select(User).where(User.id == bindparam("id"))
+user_by_email = select(User).where(func.lower(User.email) == bindparam("email"))
+
+blog_by_id = select(Blog).where(Blog.id == bindparam("id"))
+blogs_by_status = select(Blog).where(Blog.status == bindparam("status"))
+blog_rows_by_status = (select(*[Blog.__table__.c[name] for name in BlogResponseSchema.model_fields])
+                       .where(Blog.status == bindparam("status")))
+
+# Uploaded files with any of the given content hashes, for deduplicating uploads
+media_by_sha256 = select(Media).where(Media.sha256.in_(bindparam("sha256s", expanding=True)),
+                                      Media.provider == bindparam("provider"),
+                                      Media.status == "uploaded")
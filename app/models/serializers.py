@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+"""
+Serializers for list endpoints. Rows are validated once, straight from
+their attributes (ORM objects or column tuples), with TypeAdapters built
+at import time, and the endpoint returns the response itself so FastAPI
+does not validate and encode the payload a second time.
+"""
+
+from typing import List
+from pydantic import TypeAdapter
+from app.models.admins import AdminResponseSchema
+from app.models.blogs import BlogResponseSchema
+from app.dependencies.request_timing import TimedJSONResponse
+
+
+blogs_adapter = TypeAdapter(List[BlogResponseSchema])
+admins_adapter = TypeAdapter(List[AdminResponseSchema])
+
+
+def serialize_rows(adapter: TypeAdapter, rows) -> list:
+    """Returns the rows as dicts of the adapter's schema, ready for orjson"""
+    return adapter.dump_python(adapter.validate_python(rows, from_attributes=True))
+
+
+def list_response(message: str, key: str, adapter: TypeAdapter, rows) -> TimedJSONResponse:
+    """Builds the {"success", "message", "data": {"count", key}} envelope of a list endpoint"""
+    items = serialize_rows(adapter, rows)
+    return TimedJSONResponse({
+        "success": True,
+        "message": message,
+        "data": {
+            "count": len(items),
+            key: items
+        }
+    })
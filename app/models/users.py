@@ -5,9 +5,9 @@
 import enum
 from typing import List
 from datetime import datetime
-from app.models.models import Base, Basemodel, Response
-from pydantic import BaseModel, EmailStr, UUID4
-from sqlalchemy import Column, DateTime, String, Boolean, Enum, JSON
+from app.models.models import Base, Basemodel, Response, normalize_identity
+from pydantic import BaseModel, EmailStr, UUID4, field_validator
+from sqlalchemy import Column, DateTime, String, Boolean, Enum, JSON, Index, func
 from sqlalchemy.orm import relationship
 
 class UserType(str, enum.Enum):
@@ -29,7 +29,11 @@ class User(Basemodel, Base):
     pin = Column(String, nullable=False, default="") # User's hashed PIN
     type = Column(Enum(UserType), nullable=False) # User account type
     isVerified = Column(Boolean, nullable=False, default=False)
-    
+
+    __table_args__ = (
+        # Emails are stored lower-cased, lookups on lower(email) probe this index
+        Index("ix_users_email_lower", func.lower(email), unique=True),
+    )
 
 
     def __init__(self, **kwargs):
@@ -41,25 +45,29 @@ class User(Basemodel, Base):
         return self.password == password
 
 
-class UserSignupSchema(BaseModel):
+class UserEmailSchema(BaseModel):
     email: EmailStr # User's email address
+
+    @field_validator("email")
+    @classmethod
+    def normalize_email(cls, email: str) -> str:
+        """Store and look up emails in a single case"""
+        return normalize_identity(email)
+
+class UserSignupSchema(UserEmailSchema):
     type: UserType # User aacount type
 
-class UserOtpSchema(BaseModel):
-    email: EmailStr # User's email address
+class UserOtpSchema(UserEmailSchema):
     otp: str # User's otp for verification
 
-class UserPasswordSchema(BaseModel):
-    email: EmailStr # User's email address
+class UserPasswordSchema(UserEmailSchema):
     password: str # User's password
 
-class UserPasswordResetSchema(BaseModel):
-    email: EmailStr # User's email address
+class UserPasswordResetSchema(UserEmailSchema):
     password: str # User's password
     otp: str # User's otp for verification
 
-class UserPINSchema(BaseModel):
-    email: EmailStr # User's email address
+class UserPINSchema(UserEmailSchema):
     password: str # User's password
     pin: str # User's pin
 
@@ -89,4 +97,19 @@ class Data(BaseModel):
     admins: List[UserResponseSchema] 
 
 class MultipleUserResponse(Response):
-    data: Data
\ No newline at end of file
+    data: Data
+
+class UserBulkInviteSchema(BaseModel):
+    users: List[UserSignupSchema] # emails and account types of the users to invite
+
+class UserInviteStatus(BaseModel):
+    email: EmailStr # Invited user's email address
+    status: str # created/resent/verified/duplicate
+
+class BulkInviteData(BaseModel):
+    count: int # number of rows received
+    invited: int # number of users an otp was sent to
+    results: List[UserInviteStatus]
+
+class BulkInviteResponse(Response):
+    data: BulkInviteData
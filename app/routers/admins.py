@@ -2,17 +2,22 @@
 
 """admins module for defining endpoints for admin account management"""
 
+import logging
+
 from app.dependencies.error import httpError
-from app.dependencies.database import get_db
+from app.dependencies.database import get_db, get_read_db
 from app.dependencies.auth_dependencies import (validate_admin,
                                                 get_admin)
+from app.models import queries
+from app.models.serializers import admins_adapter, list_response
 from app.models.admins import Admin, AdminResponse, MultipleAdminResponse
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
+logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Admins"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -20,11 +25,11 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 @router.get("/admins/me", status_code=200, response_model=AdminResponse)
 async def get_admin_details(token: Annotated[str, Depends(oauth2_scheme)],
-                            db: Session = Depends(get_db)):
+                            db: AsyncSession = Depends(get_read_db)):
     """Endpoint for getting admin details"""
     try:
         id = validate_admin(token)
-        current_admin = get_admin(id, db)
+        current_admin = await get_admin(id, db)
         if current_admin is None:
             raise httpError(status_code=401, detail="Admin unidentified")
         data = current_admin.to_dict()
@@ -34,19 +39,19 @@ async def get_admin_details(token: Annotated[str, Depends(oauth2_scheme)],
             "data": data
         }
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 
 # @router.get("/admins/me/status")
 # async def get_my_status(token: Annotated[str, Depends(oauth2_scheme)],
-#                         db: Session = Depends(get_db)):
+#                         db: AsyncSession = Depends(get_db)):
 #     """Endpoint for getting admin status"""
 #     try:
 #         id = validate_admin(token)
-#         current_admin = get_admin(id, db)
+#         current_admin = await get_admin(id, db)
 #         if current_admin is None:
 #             raise httpError(status_code=401, detail="Admin unidentified")
 #         if current_admin.is_active:
@@ -72,12 +77,12 @@ async def get_admin_details(token: Annotated[str, Depends(oauth2_scheme)],
 # @router.put("/admins/{admin_id}/activate")
 # async def activate_admin_account(token: Annotated[str, Depends(oauth2_scheme)],
 #                                  admin_id: str,
-#                                  db: Session = Depends(get_db)):
+#                                  db: AsyncSession = Depends(get_db)):
 #     """Endpoint for activating a deactivated admin account"""
 #     try:
 #         id = validate_admin(token)
-#         administrator = get_admin(id, db)
-#         admin = get_admin(admin_id, db)
+#         administrator = await get_admin(id, db)
+#         admin = await get_admin(admin_id, db)
 #         if administrator.role != "superuser":
 #             raise httpError(status_code=403, detail="You don't have access to this resource.")
 #         if admin is None:
@@ -92,7 +97,7 @@ async def get_admin_details(token: Annotated[str, Depends(oauth2_scheme)],
 #             }
 #         admin.is_active = True
 #         data = admin.to_dict()
-#         admin.save(db)
+#         await admin.save(db)
 #         return {
 #             "success": True,
 #             "message": "Admin account activated successfully",
@@ -108,12 +113,12 @@ async def get_admin_details(token: Annotated[str, Depends(oauth2_scheme)],
 # @router.put("/admins/{admin_id}/deactivate")
 # async def deactivate_admin_account(token: Annotated[str, Depends(oauth2_scheme)],
 #                                    admin_id: str,
-#                                    db: Session = Depends(get_db)):
+#                                    db: AsyncSession = Depends(get_db)):
 #     """Endpoint for deactivating a deactivated admin account"""
 #     try:
 #         id = validate_admin(token)
-#         administrator = get_admin(id, db)
-#         admin = get_admin(admin_id, db)
+#         administrator = await get_admin(id, db)
+#         admin = await get_admin(admin_id, db)
 #         if administrator.role != "superuser":
 #             raise httpError(status_code=403, detail="You don't have access to this resource")
 #         if admin is None:
@@ -128,7 +133,7 @@ async def get_admin_details(token: Annotated[str, Depends(oauth2_scheme)],
 #             }
 #         admin.is_active = False
 #         data = admin.to_dict()
-#         admin.save(db)
+#         await admin.save(db)
 #         return {
 #             "success": True,
 #             "message": "Admin account deactivated successfully",
@@ -143,29 +148,21 @@ async def get_admin_details(token: Annotated[str, Depends(oauth2_scheme)],
 
 @router.get("/admins/all", response_model=MultipleAdminResponse)
 async def get_all_admins(token: Annotated[str, Depends(oauth2_scheme)],
-                         db: Session = Depends(get_db)):
+                         db: AsyncSession = Depends(get_read_db)):
     """
     Retrieves all admins from the database
     """
     try:
         id = validate_admin(token)
-        admin = get_admin(id, db)
+        admin = await get_admin(id, db)
         if admin is None:
             raise httpError(status_code=404, detail="Admin not found")
         if not admin.is_active:
             raise httpError(status_code=403, detail="You cannot access this resource because your account is not activated")
-        admins = db.query(Admin).all()
-        admins = list(map(lambda x: x.to_dict() , admins))
-        return {
-            "success": True,
-            "message": "All admins retrieved successfully",
-            "data": {
-                "count": len(admins),
-                "admins": admins
-                }
-        }
+        admins = (await db.execute(queries.admin_rows)).all()
+        return list_response("All admins retrieved successfully", "admins", admins_adapter, admins)
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
\ No newline at end of file
@@ -2,32 +2,38 @@
 
 """ Module containaning routes returning data for the blogs on the landing page """
 
+import logging
+
 from fastapi import HTTPException, APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
+from pydantic import UUID4
 from fastapi.security import OAuth2PasswordBearer
 
-from app.dependencies.database import get_db
+from app.dependencies.database import get_db, get_read_db
 from app.dependencies.error import httpError
 from app.dependencies.auth_dependencies import validate_admin, get_admin
+from app.models import queries
+from app.models.serializers import blogs_adapter, list_response
 from app.models.blogs import Blog, BlogUploadSchema, BlogUpdateSchema, SingleBlogResponse, MultipleBlogsResponse
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Blogs"])
 
 
 @router.post("/blogs/new", status_code=201, response_model=SingleBlogResponse)
 async def upload_blog(token: Annotated[str, Depends(oauth2_scheme)],
                       blog: BlogUploadSchema,
-                      db: Session = Depends(get_db)):
+                      db: AsyncSession = Depends(get_db)):
     """
     Create a new blog as a draft or published blog
     """
     try:
         id = validate_admin(token)
-        admin = get_admin(id, db)
+        admin = await get_admin(id, db)
         if admin is None:
             raise httpError(status_code=404, detail="Admin not found")
         if not admin.is_active:
@@ -49,7 +55,7 @@ async def upload_blog(token: Annotated[str, Depends(oauth2_scheme)],
                 raise httpError(status_code=400, detail="Invalid blog status. Status must be either 'draft' or 'published'")
 
         newBlog = Blog(**blogDict)
-        newBlog.save(db)
+        await newBlog.save(db)
         if newBlog.status == "published":
             return {
                 "success": True,
@@ -63,106 +69,82 @@ async def upload_blog(token: Annotated[str, Depends(oauth2_scheme)],
                 "data": newBlog.to_dict(),
             }
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 
 @router.get("/blogs/published/all", response_model=MultipleBlogsResponse)
-async def get_published_blogs(db: Session = Depends(get_db)):
+async def get_published_blogs(db: AsyncSession = Depends(get_read_db)):
     """
     Retrieves all published blogs from the database
     """
     try:
-        publishedBlogs = db.query(Blog).filter_by(status = "published").all()
-        publishedBlogs = list(map(lambda x: x.to_dict(), publishedBlogs))
-        return {
-            "success": True,
-            "message": "Published blogs retrieved successfully",
-            "data": {
-                "count": len(publishedBlogs),
-                "blogs": publishedBlogs
-            }
-        }
+        publishedBlogs = (await db.execute(queries.blog_rows_by_status, {"status": "published"})).all()
+        return list_response("Published blogs retrieved successfully", "blogs", blogs_adapter, publishedBlogs)
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 
 @router.get("/blogs/drafts/all", response_model=MultipleBlogsResponse)
 async def get_drafted_blogs(token: Annotated[str, Depends(oauth2_scheme)],
-                            db: Session = Depends(get_db)):
+                            db: AsyncSession = Depends(get_read_db)):
     """
     Retrieves all drafted and unpublished blogs from the database
     """
     try:
         id = validate_admin(token)
-        admin = get_admin(id, db)
+        admin = await get_admin(id, db)
         if admin is None:
             raise httpError(status_code=404, detail="Admin not found")
         if not admin.is_active:
             raise httpError(status_code=403, detail="You cannot access this resource because your account is not activated")
-        draftedBlogs = db.query(Blog).filter_by(status = "draft").all()
-        draftedBlogs = list(map(lambda x: x.to_dict(), draftedBlogs))
-        return {
-            "success": True,
-            "message": "Drafted blogs retrieved successfully",
-            "data": {
-                "count": len(draftedBlogs),
-                "blogs": draftedBlogs
-            }
-        }
+        draftedBlogs = (await db.execute(queries.blog_rows_by_status, {"status": "draft"})).all()
+        return list_response("Drafted blogs retrieved successfully", "blogs", blogs_adapter, draftedBlogs)
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 
 @router.get("/blogs/deleted/all", response_model=MultipleBlogsResponse)
 async def get_deleted_blogs(token: Annotated[str, Depends(oauth2_scheme)],
-                            db: Session = Depends(get_db)):
+                            db: AsyncSession = Depends(get_read_db)):
     """
     Retrieves all deleted blogs from the database
     """
     try:
         id = validate_admin(token)
-        admin = get_admin(id, db)
+        admin = await get_admin(id, db)
         if admin is None:
             raise httpError(status_code=404, detail="Admin not found")
         if not admin.is_active:
             raise httpError(status_code=403, detail="You cannot access this resource because your account is not activated")
-        deletedBlogs = db.query(Blog).filter_by(status = "deleted").all()
-        deletedBlogs = list(map(lambda x: x.to_dict(), deletedBlogs))
-        return {
-            "success": True,
-            "message": "Deleted blogs retrieved successfully",
-            "data": {
-                "count": len(deletedBlogs),
-                "blogs": deletedBlogs
-            }
-        }
+        deletedBlogs = (await db.execute(queries.blog_rows_by_status, {"status": "deleted"})).all()
+        return list_response("Deleted blogs retrieved successfully", "blogs", blogs_adapter, deletedBlogs)
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
     
 
 @router.put("/blogs/{blog_id}/update", response_model=SingleBlogResponse)
 async def update_blog(token: Annotated[str, Depends(oauth2_scheme)],
-                      blog_id: str,
+                      blog_id: UUID4,
                       blog: BlogUpdateSchema,
-                      db: Session = Depends(get_db)):
+                      db: AsyncSession = Depends(get_db)):
     """
     Update a blog post
     """
     try:
         id = validate_admin(token)
-        admin = get_admin(id, db)
+        admin = await get_admin(id, db)
         if admin is None:
             raise httpError(status_code=404, detail="Admin not found")
         if not admin.is_active:
@@ -170,7 +152,7 @@ async def update_blog(token: Annotated[str, Depends(oauth2_scheme)],
         if not admin.permissions["update"]:
             raise httpError(status_code=403, detail="You do not have permission to update this resource")
         blogDict = blog.model_dump()
-        oldBlog: Blog = db.query(Blog).filter_by(id = blog_id).first()
+        oldBlog: Blog = await db.scalar(queries.blog_by_id, {"id": str(blog_id)})
         if admin.id != oldBlog.author_id and admin.role != "admin" and admin.role != "superuser":
             raise httpError(status_code=403, detail="You are not authorized to update this blog")
         if oldBlog is None:
@@ -191,53 +173,53 @@ async def update_blog(token: Annotated[str, Depends(oauth2_scheme)],
                 raise httpError(status_code=400, detail="Required fields not filled correctly")
         if oldBlog.status == "published" and blogDict.get("status") == "draft":
             raise httpError(status_code=400, detail="You cannot convert an already published blog into a draft")
-        print("to update {}, id {}".format(blogDict, oldBlog.id))
-        oldBlog.update(db, **blogDict)
+        logger.debug("Updating blog %s fields %s", oldBlog.id, sorted(blogDict))
+        await oldBlog.update(db, **blogDict)
 
-        newBlog: Blog = db.query(Blog).filter_by(id = blog_id).first()
+        newBlog: Blog = await db.scalar(queries.blog_by_id, {"id": str(blog_id)})
         return {
             "success": True,
             "message": "Blog post updated successfully",
             "data": newBlog.to_dict(),
         }
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
     
 
 @router.delete("/blogs/{blog_id}/delete", status_code=204)
 async def delete_blog(token: Annotated[str, Depends(oauth2_scheme)],
-                      blog_id: str,
-                      db: Session = Depends(get_db)):
+                      blog_id: UUID4,
+                      db: AsyncSession = Depends(get_db)):
     """
     Delete a blog post
     """
     try:
         id = validate_admin(token)
-        admin = get_admin(id, db)
+        admin = await get_admin(id, db)
         if admin is None:
             raise httpError(status_code=404, detail="Admin not found")
         if not admin.is_active:
             raise httpError(status_code=403, detail="You cannot access this resource because your account is not activated")
         if not admin.permissions["delete"]:
             raise httpError(status_code=403, detail="You do not have permission to delete this resource")
-        blog = db.query(Blog).filter_by(id = blog_id).first()
+        blog = await db.scalar(queries.blog_by_id, {"id": str(blog_id)})
         if blog is None:
             raise httpError(status_code=404, detail="Blog not found")
         if admin.id != blog.author_id and admin.role != "superuser":
             raise httpError(status_code=403, detail="You are not authorized to delete this blog")
         if blog.status == "deleted":
             raise httpError(status_code=400, detail="Blog has been deleted")
-        blog.update(db, status="deleted")
+        await blog.update(db, status="deleted")
         return {
             "success": True,
             "message": "Blog post deleted successfully",
             "data": None
         }
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+"""metrics module for defining the endpoint Prometheus scrapes"""
+
+import asyncio
+import hmac
+import logging
+
+from app.dependencies.error import httpError
+from app.dependencies.metrics import render, content_type
+from app.config.settings import get_settings
+from typing import Annotated, Optional
+from fastapi import APIRouter, Header, HTTPException, Response
+
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: Annotated[Optional[str], Header()] = None):
+    """Endpoint for getting the metrics of all workers in the Prometheus text format"""
+    try:
+        if settings.metrics_token:
+            expected = f"Bearer {settings.metrics_token}"
+            if not hmac.compare_digest((authorization or "").encode(), expected.encode()):
+                raise httpError(status_code=401, detail="Invalid metrics token")
+        # Adding up the files of every worker is blocking work
+        data = await asyncio.to_thread(render)
+        return Response(content=data, media_type=content_type)
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        logger.exception(str(e))
+        raise httpError(status_code=500, detail=str(e))
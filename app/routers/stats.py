@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""stats module for defining endpoints exposing runtime statistics to superusers"""
+
+import logging
+
+from app.dependencies.error import httpError
+from app.dependencies.database import get_db, replicas
+from app.dependencies.db_pool import get_pool_stats
+from app.dependencies.cache import get_cache_pool_stats
+from app.dependencies.sql_logging import get_statement_stats, reset_statement_stats
+from app.dependencies.auth_dependencies import validate_admin, get_admin
+from app.utils.resilience import get_provider_metrics
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["Stats"])
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+
+async def check_superuser(token: str, db: AsyncSession):
+    """Ensures the token belongs to an active superuser"""
+    id = validate_admin(token)
+    admin = await get_admin(id, db)
+    if admin is None:
+        raise httpError(status_code=404, detail="Admin not found")
+    if not admin.is_active:
+        raise httpError(status_code=403, detail="You cannot access this resource because your account is not activated")
+    if admin.role != "superuser":
+        raise httpError(status_code=403, detail="You don't have access to this resource")
+
+
+@router.get("/stats/cache", status_code=200)
+async def get_cache_stats(token: Annotated[str, Depends(oauth2_scheme)],
+                          db: AsyncSession = Depends(get_db)):
+    """Endpoint for getting redis connection pool usage"""
+    try:
+        await check_superuser(token, db)
+        return {
+            "success": True,
+            "message": "Cache pool statistics retrieved successfully",
+            "data": get_cache_pool_stats()
+        }
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        logger.exception(str(e))
+        raise httpError(status_code=500, detail=str(e))
+
+
+@router.get("/stats/db-pool", status_code=200)
+async def get_db_pool_stats(token: Annotated[str, Depends(oauth2_scheme)],
+                            db: AsyncSession = Depends(get_db)):
+    """Endpoint for getting database connection pool usage, wait times and timeouts"""
+    try:
+        await check_superuser(token, db)
+        healthy = {replica.name: replica.is_healthy() for replica in replicas}
+        data = get_pool_stats()
+        for pool in data:
+            pool["healthy"] = healthy.get(pool["name"], True)
+        return {
+            "success": True,
+            "message": "Database pool statistics retrieved successfully",
+            "data": data
+        }
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        logger.exception(str(e))
+        raise httpError(status_code=500, detail=str(e))
+
+
+@router.get("/stats/sql", status_code=200)
+async def get_sql_stats(token: Annotated[str, Depends(oauth2_scheme)],
+                        limit: int = 50,
+                        reset: bool = False,
+                        db: AsyncSession = Depends(get_db)):
+    """Endpoint for getting the statements that took the most total time in this worker"""
+    try:
+        await check_superuser(token, db)
+        data = get_statement_stats(limit)
+        if reset:
+            reset_statement_stats()
+        return {
+            "success": True,
+            "message": "SQL statement statistics retrieved successfully",
+            "data": data
+        }
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        logger.exception(str(e))
+        raise httpError(status_code=500, detail=str(e))
+
+
+@router.get("/stats/outbound", status_code=200)
+async def get_outbound_stats(token: Annotated[str, Depends(oauth2_scheme)],
+                             db: AsyncSession = Depends(get_db)):
+    """Endpoint for getting the circuit state, retries and failures of outbound services"""
+    try:
+        await check_superuser(token, db)
+        return {
+            "success": True,
+            "message": "Outbound service statistics retrieved successfully",
+            "data": get_provider_metrics()
+        }
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        logger.exception(str(e))
+        raise httpError(status_code=500, detail=str(e))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+"""
+uploads module for defining endpoints for direct-to-storage media uploads.
+The api only signs the upload and verifies the result, the file itself
+goes from the client straight to s3 or cloudinary.
+"""
+
+import logging
+import random
+import string
+
+from app.dependencies.error import httpError
+from app.dependencies.database import get_db
+from app.dependencies.auth_dependencies import validate_admin, get_admin
+from app.models.media import Media, MediaProvider, UploadRequestSchema, UploadTicketResponse, MediaResponse
+from app.utils import aws_file_storage, cloudinary_file_storage
+from app.config.settings import get_settings
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from pydantic import UUID4
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["Uploads"])
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+upload_provider = MediaProvider(settings.media_upload_provider)
+upload_folder = settings.media_upload_folder
+upload_expiry = settings.media_upload_expiry_seconds
+bucket_name = settings.aws_s3_bucket_name
+max_file_size = cloudinary_file_storage.max_file_size
+
+# Accepted content types and the cloudinary resource type and formats they upload as
+allowed_types = {
+    "image/jpeg": ("image", {"jpg", "jpeg"}),
+    "video/mp4": ("video", {"mp4"}),
+}
+
+
+async def get_uploader(token: str, db: AsyncSession):
+    """Returns the active admin with create permission the token belongs to"""
+    id = validate_admin(token)
+    admin = await get_admin(id, db)
+    if admin is None:
+        raise httpError(status_code=404, detail="Admin not found")
+    if not admin.is_active:
+        raise httpError(status_code=403, detail="You cannot access this resource because your account is not activated")
+    if not admin.permissions["create"]:
+        raise httpError(status_code=403, detail="You do not have permission to create this resource")
+    return admin
+
+
+@router.post("/uploads/presign", status_code=201, response_model=UploadTicketResponse)
+async def presign_upload(token: Annotated[str, Depends(oauth2_scheme)],
+                         uploadSchema: UploadRequestSchema,
+                         db: AsyncSession = Depends(get_db)):
+    """
+    Endpoint for signing a direct upload to storage. Upload the file by
+    POSTing it with the returned fields to the returned url, then call
+    /uploads/{media_id}/complete
+    """
+    try:
+        admin = await get_uploader(token, db)
+        if uploadSchema.content_type not in allowed_types:
+            raise httpError(status_code=415, detail="Only image/jpeg and video/mp4 files can be uploaded")
+        if uploadSchema.size <= 0:
+            raise httpError(status_code=400, detail="File size is required")
+        if uploadSchema.size > max_file_size:
+            raise httpError(status_code=413, detail=f"Files cannot be larger than {max_file_size // (1024 * 1024)}MB")
+
+        # Generate unique key for the file like a filename from random unique string and filename
+        filename = uploadSchema.filename.replace(" ", "_")
+        name = f"{''.join(random.choices(string.ascii_lowercase, k=7))}-{filename.rsplit('.', 1)[0]}"
+        resource_type, formats = allowed_types[uploadSchema.content_type]
+        if upload_provider == MediaProvider.s3:
+            key = f"{upload_folder}/{name}.{filename.rsplit('.', 1)[-1].lower()}"
+            post = aws_file_storage.presigned_post(bucket_name, key, uploadSchema.content_type,
+                                                   max_file_size, upload_expiry)
+            url, fields = post["url"], post["fields"]
+        else:
+            key = f"{upload_folder}/{name}"
+            url, fields = cloudinary_file_storage.signed_upload_params(name, upload_folder, resource_type, formats)
+
+        media = Media(owner_id=admin.id, provider=upload_provider, key=key, filename=uploadSchema.filename,
+                      content_type=uploadSchema.content_type, status="pending")
+        await media.save(db)
+        return {
+            "success": True,
+            "message": "Upload signed successfully",
+            "data": {
+                "media_id": media.id,
+                "provider": upload_provider,
+                "url": url,
+                "fields": fields,
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=upload_expiry)
+            }
+        }
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        logger.exception(str(e))
+        raise httpError(status_code=500, detail=str(e))
+
+
+@router.post("/uploads/{media_id}/complete", status_code=200, response_model=MediaResponse)
+async def complete_upload(token: Annotated[str, Depends(oauth2_scheme)],
+                          media_id: UUID4,
+                          db: AsyncSession = Depends(get_db)):
+    """Endpoint for verifying a direct upload and registering the uploaded file"""
+    try:
+        admin = await get_uploader(token, db)
+        media: Media = await db.scalar(select(Media).filter_by(id = str(media_id)))
+        if media is None or media.owner_id != admin.id:
+            raise httpError(status_code=404, detail="Upload not found")
+        if media.status == "uploaded":
+            raise httpError(status_code=400, detail="Upload has already been completed")
+
+        resource_type, formats = allowed_types[media.content_type]
+        if media.provider == MediaProvider.s3:
+            metadata = await aws_file_storage.get_object_metadata(bucket_name, media.key)
+            if metadata is None:
+                raise httpError(status_code=404, detail="Uploaded file not found")
+            size, url = metadata["size"], aws_file_storage.object_url(bucket_name, media.key)
+            valid = metadata["content_type"] == media.content_type
+        else:
+            resource = await cloudinary_file_storage.get_uploaded_resource(media.key, resource_type)
+            if resource is None:
+                raise httpError(status_code=404, detail="Uploaded file not found")
+            size, url = resource["bytes"], resource["secure_url"]
+            valid = resource.get("format") in formats
+
+        # Cloudinary checks the format but cannot enforce the size limit on a signed upload,
+        # remove files that break the limits
+        if not valid or size > max_file_size:
+            if media.provider == MediaProvider.s3:
+                await aws_file_storage.delete_object(bucket_name, media.key)
+            else:
+                await cloudinary_file_storage.delete_file_from_cloud(media.key, resource_type)
+            await db.delete(media)
+            await db.commit()
+            if not valid:
+                raise httpError(status_code=415, detail=f"Uploaded file is not {media.content_type}")
+            raise httpError(status_code=413, detail=f"Files cannot be larger than {max_file_size // (1024 * 1024)}MB")
+
+        await media.update(db, size=size, url=url, status="uploaded")
+        return {
+            "success": True,
+            "message": "Upload completed successfully",
+            "data": media.to_dict()
+        }
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        logger.exception(str(e))
+        raise httpError(status_code=500, detail=str(e))
@@ -2,87 +2,194 @@
 
 """users module for defining endpoints for admin account management"""
 
-import os
+import logging
 
 from app.dependencies.error import httpError
-from app.dependencies.database import get_db
+from app.dependencies.database import get_db, get_read_db
 from app.dependencies.cache import get_cache
 from app.dependencies.auth_dependencies import (get_user,
+                                                get_admin,
+                                                validate_admin,
                                                 hash_password,
                                                 verify_password,
                                                 validate_user,
                                                 create_access_token)
-from app.models.users import User, UserSignupSchema, UserOtpSchema, UserResponse, MultipleUserResponse, UserPasswordSchema, UserPINSchema, loginResponseSchema, Response, UserPasswordResetSchema, UserPINResetSchema
+from app.models.models import normalize_identity
+from app.models import queries
+from app.models.users import User, UserSignupSchema, UserOtpSchema, UserResponse, MultipleUserResponse, UserPasswordSchema, UserPINSchema, loginResponseSchema, Response, UserPasswordResetSchema, UserPINResetSchema, UserBulkInviteSchema, BulkInviteResponse
 from app.utils.generate_otp import generate_otp
-from app.utils.send_email import send_email_background
+from app.utils.email_bloom_filter import add_emails, might_exist
+from app.utils.send_email import send_email_background, send_email_batch
 from app.utils.generate_email_templates import verificaiton_otp_html, pin_reset_otp_html, password_reset_otp_html
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis.exceptions import RedisError
 from datetime import timedelta
-from dotenv import load_dotenv
+from app.config.settings import get_settings
 
 
-load_dotenv()
+settings = get_settings()
+logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Users"])
 
-password_token_expiration = int(os.getenv("PASSWORD_JWT_TOKEN_EXPIRY_MINUTES"))
-pin_token_expiration = int(os.getenv("PIN_JWT_TOKEN_EXPIRY_MINUTES"))
+password_token_expiration = settings.password_jwt_token_expiry_minutes
+pin_token_expiration = settings.pin_jwt_token_expiry_minutes
+bulk_invite_max_rows = settings.user_bulk_invite_max_rows
+invite_email_batch_size = settings.user_invite_email_batch_size
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/auth/pin-login")
+admin_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
 @router.post("/users/send-otp", status_code=201)
 async def send_otp(userSchema: UserSignupSchema,
-                   db: Session = Depends(get_db),
+                   background_tasks: BackgroundTasks,
+                   db: AsyncSession = Depends(get_db),
                    cache = Depends(get_cache)):
     """Endpoint for sending otp for user verificarion"""
     try:
         userDict: dict[str, str] = userSchema.model_dump()
-        existingUser: User = db.query(User).filter(User.email == userDict['email']).first()
+        existingUser: User = await db.scalar(queries.user_by_email, {"email": userDict['email']})
         if existingUser is not None:
             if existingUser.isVerified:
                 raise httpError(status_code=301, detail="login")
-        else:
+        # Add to the bloom filter first, a stray bit is only a false positive. Resends add
+        # the email again, so one a Redis error kept out of the filter gets in on the retry
+        try:
+            await add_emails(cache, [userDict['email']])
+        except RedisError as e:
+            logger.warning("Could not add the email to the bloom filter: %s", str(e))
+        if existingUser is None:
             user = User(**userDict)
-            user.save(db)
+            await user.save(db)
         otp = generate_otp()
-        print(">>>>>>>" + otp + "<<<<<<<<")
         otp_key = userDict["email"]
         # store otp in cache
-        expiry = os.getenv("OTP_EXPIRY")
-        cache.set(otp_key, otp, ex=expiry)
+        expiry = settings.otp_expiry
+        await cache.set(otp_key, otp, ex=expiry)
 
         subject = "Ouul Verification OTP"
         email_html = verificaiton_otp_html(otp)
-        print(email_html)
-        send_email_background(subject, userDict["email"], "", email_html)
+        background_tasks.add_task(send_email_background, subject, userDict["email"], "", email_html)
         return {
             "success": True,
             "message": "Otp sent to user email successfully.",
             "data":  None
         }
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
+        raise httpError(status_code=500, detail=str(e))
+
+
+@router.post("/users/bulk-invite", status_code=201, response_model=BulkInviteResponse)
+async def bulk_invite(token: Annotated[str, Depends(admin_oauth2_scheme)],
+                      inviteSchema: UserBulkInviteSchema,
+                      background_tasks: BackgroundTasks,
+                      db: AsyncSession = Depends(get_db),
+                      cache = Depends(get_cache)):
+    """Endpoint for inviting many users at once and sending each a verification otp"""
+    try:
+        id = validate_admin(token)
+        admin = await get_admin(id, db)
+        if admin is None:
+            raise httpError(status_code=404, detail="Admin not found")
+        if not admin.is_active:
+            raise httpError(status_code=403, detail="You cannot access this resource because your account is not activated")
+        if not admin.permissions["create"]:
+            raise httpError(status_code=403, detail="You do not have permission to create this resource")
+        if len(inviteSchema.users) > bulk_invite_max_rows:
+            raise httpError(status_code=400, detail=f"You cannot invite more than {bulk_invite_max_rows} users at once")
+
+        # Keep the first row for every email, later repeats are reported as duplicates
+        statuses: dict[str, str] = {}
+        rows = []
+        for invitee in inviteSchema.users:
+            if invitee.email in statuses:
+                continue
+            statuses[invitee.email] = "created"
+            rows.append({"email": invitee.email, "type": invitee.type})
+
+        # One lookup for every invitee that already has an account
+        existing = await db.execute(select(User.email, User.isVerified)
+                              .where(func.lower(User.email).in_(list(statuses)))).all()
+        for email, isVerified in existing:
+            statuses[normalize_identity(email)] = "verified" if isVerified else "resent"
+
+        # One multi-row insert for the new users, rows created concurrently are left alone
+        newRows = [row for row in rows if statuses[row["email"]] == "created"]
+        # Resent invitees too, in case a Redis error kept them out of the filter before
+        try:
+            await add_emails(cache, [row["email"] for row in rows if statuses[row["email"]] != "verified"])
+        except RedisError as e:
+            logger.warning("Could not add the invited emails to the bloom filter: %s", str(e))
+        if newRows:
+            inserted = set(await db.execute(insert(User.__table__)
+                                      .on_conflict_do_nothing(index_elements=[func.lower(User.__table__.c.email)])
+                                      .returning(User.__table__.c.email),
+                                      newRows).scalars())
+            await db.commit()
+            for row in newRows:
+                if row["email"] not in inserted:
+                    statuses[row["email"]] = "resent"
+
+        # Store every otp with a single round trip to redis
+        invitees = [email for email, status in statuses.items() if status != "verified"]
+        expiry = settings.otp_expiry
+        messages = []
+        pipe = cache.pipeline(transaction=False)
+        for email in invitees:
+            otp = generate_otp()
+            pipe.set(email, otp, ex=expiry)
+            messages.append(("Ouul Verification OTP", email, "", verificaiton_otp_html(otp)))
+        await pipe.execute()
+
+        # Hand the emails off in batches once the response has been sent
+        for start in range(0, len(messages), invite_email_batch_size):
+            background_tasks.add_task(send_email_batch, messages[start:start + invite_email_batch_size])
+
+        seen = set()
+        results = []
+        for invitee in inviteSchema.users:
+            status = "duplicate" if invitee.email in seen else statuses[invitee.email]
+            seen.add(invitee.email)
+            results.append({"email": invitee.email, "status": status})
+        return {
+            "success": True,
+            "message": "Users invited successfully.",
+            "data": {
+                "count": len(results),
+                "invited": len(invitees),
+                "results": results
+            }
+        }
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 
 @router.put("/users/verify-otp", status_code=200, response_model=UserResponse)
 async def verify_otp(userSchema: UserOtpSchema,
-                     db: Session = Depends(get_db),
+                     db: AsyncSession = Depends(get_db),
                      cache = Depends(get_cache)):
     """Endpoint for verifying user by otp"""
     try:
         userDict: dict[str, str] = userSchema.model_dump()
-        unverifiedUser: User = db.query(User).filter(User.email == userDict['email']).first()
+        if not await might_exist(cache, userDict['email']):
+            raise httpError(status_code=404, detail="user not found")
+        unverifiedUser: User = await db.scalar(queries.user_by_email, {"email": userDict['email']})
         if unverifiedUser is None:
             raise httpError(status_code=404, detail="user not found")
         if unverifiedUser.isVerified:
             raise httpError(status_code=301, detail="login")
         otp_key = userDict['email']
-        cache_otp = cache.get(otp_key).decode('utf-8') # "123456" # get from cache
+        cache_otp = await cache.get(otp_key) # "123456" # get from cache
 
         if cache_otp is None:
             raise httpError(status_code=401, detail="otp expired, request a new one") 
@@ -91,9 +198,9 @@ async def verify_otp(userSchema: UserOtpSchema,
 
         if cache_otp != user_otp:
             raise httpError(status_code=400, detail="Invalid otp") 
-        unverifiedUser.update(db, isVerified=True)
-        user: User = db.query(User).filter(User.email == userDict['email']).first()
-        cache.delete(otp_key) # delete otp from cache
+        await unverifiedUser.update(db, isVerified=True)
+        user: User = await db.scalar(queries.user_by_email, {"email": userDict['email']})
+        await cache.delete(otp_key) # delete otp from cache
 
         return {
             "success": True,
@@ -101,27 +208,30 @@ async def verify_otp(userSchema: UserOtpSchema,
             "data":  user
         }
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
     
 @router.put("/users/set-password", status_code=200, response_model=UserResponse)
 async def set_password(userSchema: UserPasswordSchema,
-                       db: Session = Depends(get_db)):
+                       db: AsyncSession = Depends(get_db),
+                       cache = Depends(get_cache)):
     """Endpoint for setting user password"""
     try:
         userDict: dict[str, str] = userSchema.model_dump()
-        verifiedUser: User = db.query(User).filter(User.email == userDict['email']).first()
+        if not await might_exist(cache, userDict['email']):
+            raise httpError(status_code=404, detail="user not found")
+        verifiedUser: User = await db.scalar(queries.user_by_email, {"email": userDict['email']})
         if verifiedUser is None:
             raise httpError(status_code=404, detail="user not found")
         if not verifiedUser.isVerified:
             raise httpError(status_code=301, detail="verify user")
         if len(userDict['password']) < 8:
             raise httpError(status_code=400, detail="password must be at least 8 characters")
-        verifiedUser.update(db, password=hash_password(userDict['password']))
+        await verifiedUser.update(db, password=await hash_password(userDict['password']))
 
-        user: User = db.query(User).filter(User.email == userDict['email']).first()
+        user: User = await db.scalar(queries.user_by_email, {"email": userDict['email']})
 
         return {
             "success": True,
@@ -129,32 +239,35 @@ async def set_password(userSchema: UserPasswordSchema,
             "data":  user
         }
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 @router.put("/users/set-pin", status_code=200, response_model=UserResponse)
 async def set_pin(userSchema: UserPINSchema,
-                  db: Session = Depends(get_db)):
+                  db: AsyncSession = Depends(get_db),
+                  cache = Depends(get_cache)):
 
     """Endpoint for setting user password"""
     try:
         userDict: dict[str, str] = userSchema.model_dump()
-        verifiedUser: User = db.query(User).filter(User.email == userDict['email']).first()
+        if not await might_exist(cache, userDict['email']):
+            raise httpError(status_code=404, detail="User with email does not exist")
+        verifiedUser: User = await db.scalar(queries.user_by_email, {"email": userDict['email']})
         if verifiedUser is None:
             raise httpError(status_code=404, detail="User with email does not exist")
         if not verifiedUser.isVerified:
             raise httpError(status_code=301, detail="verify user")
-        if not verify_password(userSchema.password, hashed=str(verifiedUser.password)):
+        if not await verify_password(userSchema.password, hashed=str(verifiedUser.password)):
             raise httpError(status_code=401, detail="Invalid password")
         if len(userDict['pin']) != 4:
             raise httpError(status_code=400, detail="pin must be 4 digits")
         if not userDict['pin'].isdigit():
             raise httpError(status_code=400, detail="pin must be digits")
 
-        verifiedUser.update(db, pin=hash_password(userDict['pin']))
-        user: User = db.query(User).filter(User.email == userDict['email']).first()
+        await verifiedUser.update(db, pin=await hash_password(userDict['pin']))
+        user: User = await db.scalar(queries.user_by_email, {"email": userDict['email']})
 
         return {
             "success": True,
@@ -162,21 +275,25 @@ async def set_pin(userSchema: UserPINSchema,
             "data":  user
         }
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 @router.post("/users/auth/password-login", status_code=200, response_model=loginResponseSchema)
 async def user_login(userSchema: Annotated[OAuth2PasswordRequestForm, Depends()],
-                     db: Session = Depends(get_db)):
+                     db: AsyncSession = Depends(get_db),
+                     cache = Depends(get_cache)):
     """Endpoint for user password login"""
     try:
-        user = db.query(User).filter(User.email == userSchema.username).first()
         # userSchema.username is user's email, FastAPI just forcefully names it 'username'
+        email = normalize_identity(userSchema.username)
+        if not await might_exist(cache, email):
+            raise httpError(status_code=401, detail="User with email does not exist")
+        user = await db.scalar(queries.user_by_email, {"email": email})
         if user is None:
             raise httpError(status_code=401, detail="User with email does not exist")
-        if not verify_password(userSchema.password, hashed=str(user.password)):
+        if not await verify_password(userSchema.password, hashed=str(user.password)):
             raise httpError(status_code=401, detail="Invalid password")
         token = create_access_token({"userEmail": userSchema.username, "userId": user.id},
                                     expires_delta=timedelta(minutes=password_token_expiration))
@@ -194,28 +311,28 @@ async def user_login(userSchema: Annotated[OAuth2PasswordRequestForm, Depends()]
         }
 
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 @router.post("/users/auth/pin-login", status_code=200, response_model=loginResponseSchema)
 async def user_login(userSchema: Annotated[OAuth2PasswordRequestForm, Depends()],
                      X_Password_Authorization_Token: Annotated[str, Header()],
-                     db: Session = Depends(get_db)):
+                     db: AsyncSession = Depends(get_db)):
     """Endpoint for user pin login"""
     try:
         if X_Password_Authorization_Token is None:
             raise httpError(status_code=400, detail="X_Password_Authorization_Token header not found")
         id = validate_user(X_Password_Authorization_Token)
-        user = get_user(id, db)
+        user = await get_user(id, db)
         if user is None:
             raise httpError(status_code=404, detail="User not found")
         
         # userSchema.password is user's 4-digit pin, FastAPI just forcefully names it 'password'
         user_pin = userSchema.password
         
-        if not verify_password(user_pin, hashed=str(user.pin)):
+        if not await verify_password(user_pin, hashed=str(user.pin)):
             raise httpError(status_code=400, detail="Invalid pin")
         token = create_access_token({"userEmail": user.email, "userId": user.id},
                                     expires_delta=timedelta(minutes=pin_token_expiration))
@@ -233,18 +350,18 @@ async def user_login(userSchema: Annotated[OAuth2PasswordRequestForm, Depends()]
         }
 
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 @router.get("/users/me", status_code=200, response_model=UserResponse)
 async def get_user_details(token: Annotated[str, Depends(oauth2_scheme)],
-                           db: Session = Depends(get_db)):
+                           db: AsyncSession = Depends(get_read_db)):
     """Endpoint for getting user details"""
     try:
         id = validate_user(token)
-        current_user = get_user(id, db)
+        current_user = await get_user(id, db)
         if current_user is None:
             raise httpError(status_code=401, detail="User unidentified")
         data = current_user.to_dict()
@@ -254,34 +371,33 @@ async def get_user_details(token: Annotated[str, Depends(oauth2_scheme)],
             "data": data
         }
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 @router.post("/users/request-pin-reset", status_code=200, response_model=Response)
 async def request_pin_reset(X_Password_Authorization_Token: Annotated[str, Header()],
-                            db: Session = Depends(get_db),
+                            background_tasks: BackgroundTasks,
+                            db: AsyncSession = Depends(get_db),
                             cache = Depends(get_cache)):
     """Endpoint for requesting pin reset"""
     try:
         if X_Password_Authorization_Token is None:
             raise httpError(status_code=400, detail="X_Password_Authorization_Token header not found")
         id = validate_user(X_Password_Authorization_Token)
-        current_user = get_user(id, db)
+        current_user = await get_user(id, db)
         if current_user is None:
             raise httpError(status_code=401, detail="Invalid token, login with password")
         otp = generate_otp()
-        print(">>>>>>>" + otp + "<<<<<<<<")
         otp_key = current_user.email
         # store otp in cache
-        expiry = os.getenv("OTP_EXPIRY")
-        cache.set(otp_key, otp, ex=expiry)
+        expiry = settings.otp_expiry
+        await cache.set(otp_key, otp, ex=expiry)
 
         subject = "Ouul PIN Reset OTP"
         email_html = pin_reset_otp_html(otp)
-        print(email_html)
-        send_email_background(subject, current_user.email, "", email_html)
+        background_tasks.add_task(send_email_background, subject, current_user.email, "", email_html)
 
         return {
             "success": True,
@@ -289,15 +405,15 @@ async def request_pin_reset(X_Password_Authorization_Token: Annotated[str, Heade
             "data":  None
         }
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 @router.put("/users/reset-pin", status_code=200, response_model=UserResponse)
 async def reset_pin(userSchema: UserPINResetSchema,
                     X_Password_Authorization_Token: Annotated[str, Header()],
-                    db: Session = Depends(get_db),
+                    db: AsyncSession = Depends(get_db),
                     cache = Depends(get_cache)):
     """Endpoint for resetting user pin"""
     try:
@@ -306,13 +422,13 @@ async def reset_pin(userSchema: UserPINResetSchema,
         if userSchema.otp == "" or len(userSchema.otp) != 6:
             raise httpError(status_code=400, detail="please supply a valid 6-digit verification otp")
         id = validate_user(X_Password_Authorization_Token)
-        current_user = get_user(id, db)
+        current_user = await get_user(id, db)
         if current_user is None:
             raise httpError(status_code=401, detail="User not found")
         if not current_user.isVerified:
             raise httpError(status_code=301, detail="verify user")
         otp_key = current_user.email
-        cache_otp = cache.get(otp_key).decode('utf-8') # "123456" # get from cache
+        cache_otp = await cache.get(otp_key) # "123456" # get from cache
 
         if cache_otp is None:
             raise httpError(status_code=401, detail="otp expired, request a new one") 
@@ -326,9 +442,9 @@ async def reset_pin(userSchema: UserPINResetSchema,
         if not userSchema.pin.isdigit():
             raise httpError(status_code=400, detail="pin must be digits")
 
-        current_user.update(db, pin=hash_password(userSchema.pin))
-        user: User = db.query(User).filter(User.email == current_user.email).first()
-        cache.delete(otp_key) # delete otp from cache
+        await current_user.update(db, pin=await hash_password(userSchema.pin))
+        user: User = await db.scalar(queries.user_by_email, {"email": current_user.email})
+        await cache.delete(otp_key) # delete otp from cache
 
         return {
             "success": True,
@@ -337,33 +453,35 @@ async def reset_pin(userSchema: UserPINResetSchema,
         }
 
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
     
 @router.post("/users/{user_email}/request-password-reset", status_code=200, response_model=Response)
 async def request_password_reset(user_email: str,
-                                 db: Session = Depends(get_db),
+                                 background_tasks: BackgroundTasks,
+                                 db: AsyncSession = Depends(get_db),
                                  cache = Depends(get_cache)):
     """Endpoint for requesting password reset"""
     try:
-        verifiedUser: User = db.query(User).filter(User.email == user_email).first()
+        user_email = normalize_identity(user_email)
+        if not await might_exist(cache, user_email):
+            raise httpError(status_code=404, detail="user not found")
+        verifiedUser: User = await db.scalar(queries.user_by_email, {"email": user_email})
         if verifiedUser is None:
             raise httpError(status_code=404, detail="user not found")
         if not verifiedUser.isVerified:
             raise httpError(status_code=301, detail="verify user")
         otp = generate_otp()
-        print(">>>>>>>" + otp + "<<<<<<<<")
         otp_key = user_email
         # store otp in cache
-        expiry = os.getenv("OTP_EXPIRY")
-        cache.set(otp_key, otp, ex=expiry)
+        expiry = settings.otp_expiry
+        await cache.set(otp_key, otp, ex=expiry)
 
         subject = "Ouul Password Reset OTP"
         email_html = password_reset_otp_html(otp)
-        print(email_html)
-        send_email_background(subject, user_email, "", email_html)
+        background_tasks.add_task(send_email_background, subject, user_email, "", email_html)
 
         return {
             "success": True,
@@ -371,14 +489,14 @@ async def request_password_reset(user_email: str,
             "data":  None
         }
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
 
 @router.put("/users/reset-password", status_code=200, response_model=UserResponse)
 async def reset_password(userSchema: UserPasswordResetSchema,
-                         db: Session = Depends(get_db),
+                         db: AsyncSession = Depends(get_db),
                          cache = Depends(get_cache)):
     """Endpoint for resetting user password"""
     try:
@@ -390,8 +508,10 @@ async def reset_password(userSchema: UserPasswordResetSchema,
         if userSchema.password == "":
             raise httpError(status_code=400, detail="please supply a valid password to reset to")
 
-        cache_otp = cache.get(otp_key).decode('utf-8') # "123456" # get from cache
-        current_user: User = db.query(User).filter(User.email == userSchema.email).first()
+        if not await might_exist(cache, userSchema.email):
+            raise httpError(status_code=404, detail="user not found")
+        cache_otp = await cache.get(otp_key) # "123456" # get from cache
+        current_user: User = await db.scalar(queries.user_by_email, {"email": userSchema.email})
 
         if current_user is None:
             raise httpError(status_code=404, detail="user not found")
@@ -405,9 +525,9 @@ async def reset_password(userSchema: UserPasswordResetSchema,
             raise httpError(status_code=400, detail="Invalid otp")
         if len(userSchema.password) < 8:
             raise httpError(status_code=400, detail="password must be at least 8 characters")
-        current_user.update(db, password=hash_password(userSchema.password))
-        user: User = db.query(User).filter(User.email == current_user.email).first()
-        cache.delete(otp_key) # delete otp from cache
+        await current_user.update(db, password=await hash_password(userSchema.password))
+        user: User = await db.scalar(queries.user_by_email, {"email": current_user.email})
+        await cache.delete(otp_key) # delete otp from cache
 
         return {
             "success": True,
@@ -416,7 +536,7 @@ async def reset_password(userSchema: UserPasswordResetSchema,
         }
 
     except Exception as e:
-        print(str(e))
         if isinstance(e, HTTPException):
             raise e
+        logger.exception(str(e))
         raise httpError(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,59 +1,154 @@
 #!/usr/bin/env python3
 
-""" Module for handling file upload to aws s3 bucket """
-import boto3, os, time
+"""
+Module for handling file upload to aws s3 bucket.
+boto3 is imported when the client is first needed, not when the app starts.
+"""
+import logging
+import threading
 
 from fastapi import UploadFile
 
+from app.config.settings import get_settings
+from app.utils import resilience
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
 # Configure AWS credentials
-aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
-aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-max_retries = os.getenv("FILE_UPLOAD_MAX_RETRIES")
-retry_delay = os.getenv("FILE_UPLOAD_RETRY_DELAY")
-
-# Create an S3 client
-# s3 = boto3.client('s3', aws_access_key_id=aws_access_key_id, aws_secret_access_key=aws_secret_access_key)
-
-def upload_file_to_cloud(file: UploadFile, bucket_name: str, object_name: str, content_type) -> bool:
-    """
-    Uploads a file to AWS S3 bucket with retry mechanism
-    """
-    for attempt in range(1, max_retries + 1):
-        try:
-            # Create an S3 client
-            s3 = boto3.client('s3', aws_access_key_id=aws_access_key_id, aws_secret_access_key=aws_secret_access_key)
-
-            # Upload the file
-            s3.upload_fileobj(file, bucket_name, object_name, ExtraArgs={'ContentType': content_type})
-
-            print(f"File '{file}' uploaded to '{bucket_name}' as '{object_name}' on attempt {attempt}")
-            return True
-        except Exception as e:
-            print(f"Error uploading file on Uattempt {attempt}: {str(e)}")
-            if attempt < max_retries:
-                print(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-    print(f"Max retry attempts reached. File upload failed.")
+aws_access_key_id = settings.aws_access_key_id
+aws_secret_access_key = settings.aws_secret_access_key
+aws_region = settings.aws_region
+# Points the client at an S3 compatible stand-in (minio, localstack) for local runs and tests
+endpoint_url = settings.aws_s3_endpoint_url
+max_retries = settings.file_upload_max_retries
+max_pool_connections = settings.aws_s3_max_pool_connections
+multipart_threshold = settings.aws_s3_multipart_threshold
+multipart_chunksize = settings.aws_s3_multipart_chunksize
+transfer_concurrency = settings.aws_s3_transfer_concurrency
+
+client_lock = threading.Lock()
+s3 = None
+transfer_config = None
+
+def get_s3_client():
+    """
+    Returns the S3 client shared by all uploads and downloads. It is created
+    once, so credentials are resolved once and connections are pooled.
+    """
+    global s3
+    with client_lock:
+        if s3 is None:
+            import boto3
+            from botocore.config import Config
+            s3 = boto3.client(
+                's3',
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                region_name=aws_region,
+                endpoint_url=endpoint_url,
+                config=Config(
+                    # Parallel parts of every transfer share this pool
+                    max_pool_connections=max_pool_connections,
+                    # Failed calls are retried by app.utils.resilience
+                    retries={"total_max_attempts": 1}
+                )
+            )
+        return s3
+
+def get_transfer_config():
+    """
+    Returns the transfer settings of uploads and downloads: objects larger than
+    the threshold are uploaded in parts and downloaded in ranges, in parallel
+    """
+    global transfer_config
+    if transfer_config is None:
+        from boto3.s3.transfer import TransferConfig
+        transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=transfer_concurrency,
+            use_threads=True
+        )
+    return transfer_config
+
+def retryable_s3_error(error: Exception) -> bool:
+    """Requests s3 rejected (4xx other than throttling) are not retried"""
+    from botocore.exceptions import ClientError
+    if isinstance(error, ClientError):
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 500)
+        return status == 429 or status >= 500
+    return True
+
+def upload_fileobj(file, bucket_name: str, object_name: str, content_type):
+    """Uploads a file object to s3 from its first byte, in parallel parts when it is large"""
+    # Read an UploadFile through its spooled temp file, boto3 needs blocking reads
+    file = getattr(file, "file", file)
+    file.seek(0)
+    get_s3_client().upload_fileobj(file, bucket_name, object_name,
+                                   ExtraArgs={'ContentType': content_type}, Config=get_transfer_config())
+
+async def upload_file_to_cloud(file: UploadFile, bucket_name: str, object_name: str, content_type) -> bool:
+    """
+    Uploads a file to AWS S3 bucket, off the event loop, with retry mechanism
+    """
+    try:
+        await resilience.call("s3", upload_fileobj, file, bucket_name, object_name, content_type,
+                              attempts=max_retries, retryable=retryable_s3_error)
+        logger.info("File uploaded to '%s' as '%s'", bucket_name, object_name)
+        return True
+    except Exception as e:
+        logger.error("Error uploading file '%s': %s", object_name, str(e))
+    return False
+
+def download_file(bucket_name: str, object_name: str, dest: str):
+    """Downloads an s3 object to dest, in parallel byte ranges when it is large"""
+    get_s3_client().download_file(bucket_name, object_name, dest, Config=get_transfer_config())
+
+async def get_file_from_cloud(file: str, dest:str, bucket_name: str, object_name: str) -> bool:
+    """
+    Retrieves a file to AWS S3 bucket, off the event loop, with retry mechanism
+    """
+    try:
+        await resilience.call("s3", download_file, bucket_name, object_name, dest,
+                              attempts=max_retries, retryable=retryable_s3_error)
+        logger.info("File '%s' retrieved from '%s' as '%s'", file, bucket_name, dest)
+        return True
+    except Exception as e:
+        logger.error("Error retrieving file '%s': %s", object_name, str(e))
     return False
 
-def get_file_from_cloud(file: str, dest:str, bucket_name: str, object_name: str) -> bool:
-    """
-    Retrieves a file to AWS S3 bucket with retry mechanism
-    """
-    for attempt in range(1, max_retries + 1):
-        try:
-            # Create an S3 client
-            s3 = boto3.client('s3', aws_access_key_id=aws_access_key_id, aws_secret_access_key=aws_secret_access_key) 
-
-            # download the file
-            s3.download_file(bucket_name, object_name, dest)
- 
-            print(f"File '{file}' retrieved from '{bucket_name}' as '{dest}' on attempt {attempt}")
-            return True
-        except Exception as e:
-            print(f"Error retrieving file on attempt {attempt}: {str(e)}")
-            if attempt < max_retries:
-                print(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-    print(f"Max retry attempts reached. File download failed.")
-    return False
\ No newline at end of file
+def presigned_post(bucket_name: str, object_name: str, content_type: str, max_size: int, expires_in: int) -> dict:
+    """
+    Returns the url and form fields a client can POST one file to s3 with.
+    S3 itself rejects files of another content type or larger than max_size.
+    """
+    return get_s3_client().generate_presigned_post(
+        bucket_name,
+        object_name,
+        Fields={"Content-Type": content_type},
+        Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_size]],
+        ExpiresIn=expires_in
+    )
+
+def object_url(bucket_name: str, object_name: str) -> str:
+    """Returns the url of an s3 object"""
+    return f"{get_s3_client().meta.endpoint_url}/{bucket_name}/{object_name}"
+
+async def get_object_metadata(bucket_name: str, object_name: str) -> dict:
+    """Returns the size and content type of an s3 object, or None if it does not exist"""
+    from botocore.exceptions import ClientError
+    try:
+        head = await resilience.call("s3", get_s3_client().head_object, Bucket=bucket_name, Key=object_name,
+                                     attempts=max_retries, retryable=retryable_s3_error)
+    except ClientError as e:
+        if e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 404:
+            return None
+        raise
+    return {"size": head["ContentLength"], "content_type": head.get("ContentType")}
+
+async def delete_object(bucket_name: str, object_name: str):
+    """Deletes an s3 object"""
+    await resilience.call("s3", get_s3_client().delete_object, Bucket=bucket_name, Key=object_name,
+                          attempts=max_retries, retryable=retryable_s3_error)
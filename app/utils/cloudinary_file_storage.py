@@ -1,65 +1,193 @@
 #!/usr/bin/env python3
 
-""" Module for handling file upload to Cloudinary """
-import os, time
-import random
-import string
-import requests
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+"""
+Module for handling file upload to Cloudinary.
+The cloudinary SDK is imported when it is first needed, not when the app starts.
+"""
+import os
+import asyncio
+import logging
+import hashlib
 
 from fastapi import UploadFile
-from dotenv import load_dotenv
+from functools import lru_cache
 from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
+from app.config.settings import get_settings
 from app.dependencies.error import httpError
+from app.models import queries
+from app.models.media import Media, MediaProvider
+from app.utils import resilience, media_cache
 
-# Load the environment variables from the .env file
-load_dotenv()
+settings = get_settings()
 
-# Configure Cloudinary credentials
-cloudinary.config(
-  cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-  api_key=os.getenv("CLOUDINARY_API_KEY"),
-  api_secret=os.getenv("CLOUDINARY_API_SECRET")
-)
+logger = logging.getLogger(__name__)
 
-max_retries = int(os.getenv("FILE_UPLOAD_MAX_RETRIES"))
-retry_delay = int(os.getenv("FILE_UPLOAD_RETRY_DELAY"))
+max_retries = settings.file_upload_max_retries
+max_file_size = settings.file_upload_max_bytes
+chunk_size = settings.file_upload_chunk_size # cloudinary needs at least 5MB
+upload_concurrency = settings.file_upload_concurrency
+hash_chunk_size = 1024 * 1024
+thumbnail_size = settings.media_thumbnail_size
+derivative_widths = [int(width) for width in settings.media_derivative_widths.split(",")]
 
-async def upload_file_to_cloud(filename: str, file_content: bytes, public_id: str, folder: str, resource_type: str = "auto") -> dict:
+# Variants of uploaded images for clients to download instead of the original.
+# They are generated once by cloudinary in the background (eager_async) right after upload.
+image_derivatives = {
+    "thumbnail": {"width": thumbnail_size, "height": thumbnail_size, "crop": "fill", "gravity": "auto", "format": "webp"},
+    **{f"webp_{width}": {"width": width, "crop": "limit", "format": "webp"} for width in derivative_widths}
+}
+
+# Bounds the uploads running at once across all requests, each one holds a worker thread
+upload_slots = asyncio.Semaphore(upload_concurrency)
+
+
+@lru_cache
+def get_cloudinary():
+    """Imports and configures the cloudinary SDK on first use and returns it"""
+    import cloudinary
+    import cloudinary.uploader
+    import cloudinary.api
+    import cloudinary.exceptions
+    import cloudinary.utils
+
+    # Configure Cloudinary credentials
+    cloudinary.config(
+      cloud_name=settings.cloudinary_cloud_name,
+      api_key=settings.cloudinary_api_key,
+      api_secret=settings.cloudinary_api_secret
+    )
+    return cloudinary
+
+
+class UploadStream:
     """
-    Uploads a file to Cloudinary with retry mechanism
+    Reads a spooled upload from the start in chunks. upload_large closes the
+    file it is given, this keeps the upload open so a failed attempt can be retried.
     """
-    print(f"Uploading file '{filename}' to Cloudinary...")
-    for attempt in range(1, max_retries + 1):
+
+    def __init__(self, file):
+        self.file = file
+        self.name = "stream"
+        self.file.seek(0)
+
+    def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self.file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def upload_size(file: UploadFile) -> int:
+    """Returns the size of an upload without reading it"""
+    if file.size is not None:
+        return file.size
+    position = file.file.tell()
+    size = file.file.seek(0, os.SEEK_END)
+    file.file.seek(position)
+    return size
+
+
+def file_digest(file) -> str:
+    """Returns the sha256 of a spooled upload, streamed from disk in chunks"""
+    hasher = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(hash_chunk_size), b""):
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def derivative_urls(public_id: str) -> dict:
+    """Returns the urls of the derivatives of an uploaded image"""
+    cloudinary = get_cloudinary()
+    return {name: cloudinary.utils.cloudinary_url(public_id, secure=True, **options)[0]
+            for name, options in image_derivatives.items()}
+
+
+def retryable_cloudinary_error(error: Exception) -> bool:
+    """Requests cloudinary rejected are not retried, network errors and server errors are"""
+    cloudinary = get_cloudinary()
+    return not isinstance(error, (cloudinary.exceptions.BadRequest,
+                                  cloudinary.exceptions.AuthorizationRequired,
+                                  cloudinary.exceptions.NotAllowed,
+                                  cloudinary.exceptions.NotFound,
+                                  cloudinary.exceptions.AlreadyExists))
+
+def upload_large_from_start(file_content, **options) -> dict:
+    """Streams the upload to cloudinary in chunks from its first byte, so every attempt starts over"""
+    return get_cloudinary().uploader.upload_large(UploadStream(file_content), **options)
+
+async def upload_file_to_cloud(filename: str, file_content, public_id: str, folder: str, resource_type: str = "auto", **options) -> dict:
+    """
+    Uploads a file to Cloudinary in chunks, off the event loop, with retry mechanism.
+    file_content is the file object of the upload, it is streamed from disk.
+    """
+    async with upload_slots:
+        logger.debug("Uploading file '%s' to Cloudinary", filename)
         try:
             # Upload the file
-            response = cloudinary.uploader.upload(
+            response = await resilience.call(
+                "cloudinary",
+                upload_large_from_start,
                 file_content,
+                filename=filename,
+                chunk_size=chunk_size,
                 public_id=public_id,
                 folder=folder,
-                resource_type=resource_type
+                resource_type=resource_type,
+                **options,
+                attempts=max_retries,
+                retryable=retryable_cloudinary_error
             )
 
-            print(f"File '{filename}' uploaded to Cloudinary on attempt {attempt}")
+            logger.info("File '%s' uploaded to Cloudinary", filename)
             return {"success": True, "response": response}
         except Exception as e:
-            print(f"Error uploading file on attempt {attempt}: {str(e)}")
-            if attempt < max_retries:
-                print(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-    print(f"Max retry attempts reached. File upload failed.")
-    return {"success": False, "response": "Max retry attempts reached. File upload failed."}
+            logger.error("Error uploading file '%s': %s", filename, str(e))
+    return {"success": False, "response": "File upload failed."}
 
-async def process_file_upload(files: List[UploadFile], folder: str) -> dict:
-    output = {"image_urls": [], "video_url": ""}
+async def process_file_upload(files: List[UploadFile], folder: str, db: AsyncSession, owner_id: str) -> dict:
+    """
+    Uploads files to cloudinary and returns their urls, with the urls of the
+    derivatives of every image alongside image_urls. Files are identified by
+    the sha256 of their content, one that was uploaded before is not uploaded again.
+    """
+    output = {"image_urls": [], "image_derivatives": [], "video_url": ""}
 
+    # Reject oversized files and extra videos before anything is uploaded
+    videos = 0
     for file in files:
-        # Get file contents
-        contents = await file.read()
+        if upload_size(file) > max_file_size:
+            raise httpError(status_code=413, detail=f"'{file.filename}' is larger than the {max_file_size // (1024 * 1024)}MB limit")
+        if file.filename.split(".")[-1].lower() == 'mp4':
+            videos += 1
+    if videos > 1:
+        raise httpError(status_code=400, detail="You cannot upload more than one video")
+
+    # Hash the spooled files off the event loop, then find the ones already uploaded.
+    # This reads every file once before its upload reads it again: the hash has to be
+    # known up front, to skip known content and as the public id, so it can't be
+    # taken while streaming. The second read comes from the spooled temp file.
+    digests = await asyncio.gather(*[asyncio.to_thread(file_digest, file.file) for file in files])
+    known = {media.sha256: media for media in await db.scalars(
+        queries.media_by_sha256, {"sha256s": list(set(digests)), "provider": MediaProvider.cloudinary})}
+
+    uploads = {}
+    for file, digest in zip(files, digests):
+        if digest in known or digest in uploads:
+            continue
 
         # Determine file extension
         file_extension = file.filename.split(".")[-1].lower()
@@ -70,72 +198,122 @@ async def process_file_upload(files: List[UploadFile], folder: str) -> dict:
         # change spaces to underscores in filename
         file.filename = file.filename.replace(" ", "_")
 
-        # Generate unique public id for the file like a filename from random unique string and filename
-        public_id = f"{''.join(random.choices(string.ascii_lowercase, k=7))}-{file.filename.split('.')[0]}"
+        # Images get their derivatives generated by cloudinary once, in the background
+        options = {"eager": list(image_derivatives.values()), "eager_async": True} if content_type == 'image' else {}
 
-        # Call the function to upload the file
-        response = await upload_file_to_cloud(file.filename, contents, public_id, folder, content_type)
-        if not response["success"]:
-            raise httpError(status_code=500, detail="Error uploading file to cloud storage")
+        # The file is streamed from its spooled temp file, never read into memory whole.
+        # The content hash is the public id, so the same content always maps to the same file.
+        uploads[digest] = (file, upload_file_to_cloud(file.filename, file.file, digest, folder, content_type, **options))
 
-        url = response["response"]["secure_url"]
+    # Upload the new files concurrently and record them for later deduplication,
+    # the ones that made it are kept even when another failed so a retry skips them
+    responses = await asyncio.gather(*[upload for _, upload in uploads.values()])
+    failed = [file.filename for (file, _), response in zip(uploads.values(), responses) if not response["success"]]
+    for (digest, (file, _)), response in zip(uploads.items(), responses):
+        if not response["success"]:
+            continue
+        known[digest] = Media(owner_id=owner_id, provider=MediaProvider.cloudinary,
+                              key=response["response"]["public_id"], filename=file.filename,
+                              content_type=file.content_type or "application/octet-stream",
+                              size=response["response"].get("bytes"), url=response["response"]["secure_url"],
+                              status="uploaded", sha256=digest)
+        db.add(known[digest])
+    if len(failed) < len(uploads):
+        await db.commit()
+    if failed:
+        raise httpError(status_code=500, detail=f"Error uploading {', '.join(failed)} to cloud storage")
 
+    for file, digest in zip(files, digests):
+        media = known[digest]
+        file_extension = file.filename.split(".")[-1].lower()
         if file_extension == 'mp4':
-            if output["video_url"] == '': # Checks if this is the first and only video to be uploaded for the project
-                output["video_url"] = url
-            else: # Throw error if a video has been stored previously
-                raise httpError(status_code=400, detail="You cannot upload more than one video")
+            output["video_url"] = media.url
         elif file_extension in ['jpg', 'jpeg']:
-            output["image_urls"].append(url)
+            output["image_urls"].append(media.url)
+            output["image_derivatives"].append(derivative_urls(media.key))
     return output
 
-def delete_file_from_cloud(public_id: str, resource_type: str = "image") -> bool:
+def destroy_file(public_id: str, resource_type: str) -> dict:
+    """Deletes a file from cloudinary, raising if it was not deleted"""
+    response = get_cloudinary().uploader.destroy(public_id, resource_type=resource_type)
+    logger.debug("Cloudinary destroy of '%s': %s", public_id, response.get('result'))
+    if response.get('result') != 'ok':
+        raise Exception("File deletion failed")
+    return response
+
+async def delete_file_from_cloud(public_id: str, resource_type: str = "image") -> bool:
     """
     Deletes a file from Cloudinary with retry mechanism
     """
-    print(f"Deleting file '{public_id}' from Cloudinary...")
-    for attempt in range(1, max_retries + 1):
+    logger.debug("Deleting file '%s' from Cloudinary", public_id)
+    try:
+        # Delete the file
+        await resilience.call("cloudinary", destroy_file, public_id, resource_type,
+                              attempts=max_retries, retryable=retryable_cloudinary_error)
+        logger.info("File '%s' deleted from Cloudinary", public_id)
+        return True
+    except Exception as e:
+        logger.error("Error deleting file '%s': %s", public_id, str(e))
+    return False
+
+def download_file(public_id: str, resource_type: str, dest: str):
+    """Copies a file from cloudinary to dest, through the media cache"""
+    source = f"cloudinary:{resource_type}:{public_id}"
+    path = media_cache.lookup(source)
+    if path is not None:
         try:
-            # Delete the file
-            response = cloudinary.uploader.destroy(public_id, resource_type=resource_type)
-            print(response)
-            if response.get('result') == 'ok':
-                print(f"File '{public_id}' deleted from Cloudinary on attempt {attempt}")
-                return True
-            else:
-                raise Exception("File deletion failed")
-        except Exception as e:
-            print(f"Error deleting file on attempt {attempt}: {str(e)}")
-            if attempt < max_retries:
-                print(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-    print(f"Max retry attempts reached. File deletion failed.")
+            media_cache.copy_to(path, dest)
+            return
+        except FileNotFoundError:
+            # Another worker evicted it since the lookup, a cache miss
+            pass
+
+    # Get the file URL
+    result = get_cloudinary().api.resource(public_id, resource_type=resource_type)
+    file_url = result.get('secure_url') or result.get('url')
+    if not file_url:
+        raise Exception("File URL not found")
+
+    # Stream the file to disk, a retry resumes where the failed attempt stopped,
+    # or downloads it again if it was evicted before the copy
+    media_cache.copy_to(media_cache.fetch(source, file_url), dest)
+
+async def get_file_from_cloud(public_id: str, dest: str, resource_type: str = "auto") -> bool:
+    """
+    Retrieves a file from Cloudinary with retry mechanism, repeated
+    retrievals are served from the local media cache
+    """
+    try:
+        await resilience.call("cloudinary", download_file, public_id, resource_type, dest,
+                              attempts=max_retries, retryable=retryable_cloudinary_error)
+        logger.info("File '%s' retrieved from Cloudinary as '%s'", public_id, dest)
+        return True
+    except Exception as e:
+        logger.error("Error retrieving file '%s': %s", public_id, str(e))
     return False
 
-def get_file_from_cloud(public_id: str, dest: str, resource_type: str = "auto") -> bool:
+def signed_upload_params(public_id: str, folder: str, resource_type: str, formats: set) -> tuple:
     """
-    Retrieves a file from Cloudinary with retry mechanism
+    Returns the upload url and signed form fields a client can upload one
+    file to cloudinary with, without it passing through the api servers.
+    Cloudinary itself rejects files in other formats than the given ones.
     """
-    for attempt in range(1, max_retries + 1):
-        try:
-            # Get the file URL
-            result = cloudinary.api.resource(public_id, resource_type=resource_type)
-            file_url = result.get('url')
-
-            if file_url:
-                # Download the file
-                with open(dest, 'wb') as file:
-                    response = requests.get(file_url)
-                    file.write(response.content)
-
-                print(f"File '{public_id}' retrieved from Cloudinary as '{dest}' on attempt {attempt}")
-                return True
-            else:
-                raise Exception("File URL not found")
-        except Exception as e:
-            print(f"Error retrieving file on attempt {attempt}: {str(e)}")
-            if attempt < max_retries:
-                print(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-    print(f"Max retry attempts reached. File download failed.")
-    return False
\ No newline at end of file
+    cloudinary = get_cloudinary()
+    params = cloudinary.utils.sign_request({
+        "timestamp": cloudinary.utils.now(),
+        "public_id": public_id,
+        "folder": folder,
+        "allowed_formats": ",".join(sorted(formats))
+    }, {})
+    url = cloudinary.utils.cloudinary_api_url("upload", resource_type=resource_type)
+    return url, {key: str(value) for key, value in params.items()}
+
+async def get_uploaded_resource(public_id: str, resource_type: str) -> dict:
+    """Returns the details of an uploaded file, or None if it does not exist"""
+    cloudinary = get_cloudinary()
+    try:
+        return await resilience.call("cloudinary", cloudinary.api.resource, public_id,
+                                     resource_type=resource_type, attempts=max_retries,
+                                     retryable=retryable_cloudinary_error)
+    except cloudinary.exceptions.NotFound:
+        return None
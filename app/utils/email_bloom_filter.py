@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+"""
+Module for the Redis-hosted Bloom filter of registered user emails.
+
+Public auth endpoints check it before touching Postgres: an email the
+filter has never seen is certainly not registered, so the request can be
+rejected without a database query. The filter is a plain Redis bitmap so
+it works without the RedisBloom module.
+
+Rebuild it from the users table with:
+
+    $ python -m app.utils.email_bloom_filter
+"""
+
+import math
+import asyncio
+import hashlib
+import logging
+
+from datetime import datetime, timezone
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from app.models.users import User
+from app.config.settings import get_settings
+
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+filter_key = settings.bloom_filter_key
+# Set by rebuild(), until then the filter is incomplete and lets every email through
+built_key = f"{filter_key}:built"
+capacity = settings.bloom_filter_capacity
+error_rate = settings.bloom_filter_error_rate
+
+
+def filter_size(capacity: int, error_rate: float) -> tuple:
+    """Returns the number of bits and hash functions for the wanted capacity and error rate"""
+    bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+num_bits, num_hashes = filter_size(capacity, error_rate)
+
+
+def bit_positions(email: str) -> list:
+    """Returns the bits an email sets, using double hashing over one blake2b digest"""
+    digest = hashlib.blake2b(email.encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % num_bits for i in range(num_hashes)]
+
+
+async def add_emails(cache, emails: list, key: str = filter_key):
+    """
+    Adds emails to the filter with a single round trip. The live filter is
+    left alone until it has been built, the rebuild loads every email.
+    """
+    if not emails:
+        return
+    if key == filter_key and not await cache.exists(built_key):
+        return
+    pipe = cache.pipeline(transaction=False)
+    for email in emails:
+        for position in bit_positions(email):
+            pipe.setbit(key, position, 1)
+    await pipe.execute()
+
+
+async def might_exist(cache, email: str) -> bool:
+    """
+    Returns False only when the email is certainly not registered.
+    A filter that has not been built yet, or an unreachable Redis,
+    lets every email through to the database.
+    """
+    try:
+        pipe = cache.pipeline(transaction=False)
+        pipe.exists(built_key)
+        arguments = []
+        for position in bit_positions(email):
+            arguments.extend(("GET", "u1", position))
+        pipe.execute_command("BITFIELD", filter_key, *arguments)
+        built, bits = await pipe.execute()
+    except RedisError as e:
+        logger.warning("Bloom filter unavailable: %s", str(e))
+        return True
+    return not built or all(bits)
+
+
+async def rebuild(cache, db, batch_size: int = 5000) -> int:
+    """
+    Rebuilds the filter from the users table into a scratch key, swaps it
+    in and marks it built atomically. Emails registered while the rebuild
+    ran are added again after the swap. Returns the number of emails loaded.
+    """
+    started_at = datetime.now(timezone.utc)
+    scratch_key = f"{filter_key}:rebuild"
+    await cache.delete(scratch_key)
+    # Allocate the whole bitmap up front so a small table still gives a full size filter
+    await cache.setbit(scratch_key, num_bits - 1, 0)
+    count = 0
+    result = await db.stream(select(User.email).execution_options(yield_per=batch_size))
+    async for emails in result.scalars().partitions():
+        await add_emails(cache, emails, key=scratch_key)
+        count += len(emails)
+    pipe = cache.pipeline(transaction=True)
+    pipe.rename(scratch_key, filter_key)
+    pipe.set(built_key, started_at.isoformat())
+    await pipe.execute()
+
+    recent = (await db.scalars(select(User.email).where(User.created_at >= started_at))).all()
+    await add_emails(cache, recent)
+    return count
+
+
+async def _main():
+    from app.dependencies.cache import create_cache_pool, close_cache_pool
+    from app.dependencies.database import Session
+    import redis.asyncio as redis
+
+    cache = redis.Redis(connection_pool=create_cache_pool())
+    try:
+        async with Session() as db:
+            count = await rebuild(cache, db)
+        print(f"Bloom filter '{filter_key}' rebuilt with {count} emails "
+              f"({num_bits} bits, {num_hashes} hashes)")
+    finally:
+        await cache.aclose()
+        await close_cache_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+"""
+Local disk cache for media downloaded from storage.
+
+Files are stored once per content (objects/<sha256 of the content>) and
+found through a pointer per source (sources/<sha256 of the source id>),
+so the same file fetched under two names is kept once. Downloads are
+streamed to disk in chunks and resumed with a Range request when an
+earlier attempt was cut off. Once the cache grows past
+MEDIA_CACHE_MAX_BYTES the least recently used files are evicted.
+"""
+
+import os
+import fcntl
+import shutil
+import hashlib
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from app.config.settings import get_settings
+from app.dependencies.request_timing import record_http_response
+
+if TYPE_CHECKING:
+    import requests
+
+
+settings = get_settings()
+
+cache_dir = settings.media_cache_dir
+max_cache_size = settings.media_cache_max_bytes
+chunk_size = settings.media_download_chunk_size
+download_timeout = settings.media_download_timeout
+
+
+@lru_cache
+def get_session() -> "requests.Session":
+    """Shared session so downloads reuse connections to the storage hosts, created on first use"""
+    import requests
+    session = requests.Session()
+    session.hooks["response"].append(record_http_response)
+    return session
+
+
+def cache_path(*parts: str) -> str:
+    path = os.path.join(cache_dir, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def source_digest(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def lookup(source: str) -> str:
+    """Returns the cached file of a source and marks it recently used, or None"""
+    pointer = cache_path("sources", source_digest(source))
+    try:
+        with open(pointer) as file:
+            digest = file.read().strip()
+    except FileNotFoundError:
+        return None
+    path = cache_path("objects", digest)
+    try:
+        # The modification time orders files for LRU eviction
+        os.utime(path)
+    except FileNotFoundError:
+        # The file was evicted, drop the dangling pointer
+        os.remove(pointer)
+        return None
+    return path
+
+
+def download(url: str, partial: str) -> str:
+    """
+    Streams url into the partial file, resuming after the bytes already
+    there, and returns the sha256 of the whole file
+    """
+    hasher = hashlib.sha256()
+    offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with get_session().get(url, headers=headers, stream=True, timeout=download_timeout) as response:
+        if response.status_code == 416:
+            # The partial file already holds the whole content
+            response.close()
+        else:
+            response.raise_for_status()
+            if response.status_code != 206:
+                # The server ignored the range, start over
+                offset = 0
+            with open(partial, "r+b" if offset else "wb") as file:
+                file.seek(offset)
+                file.truncate()
+                for chunk in response.iter_content(chunk_size):
+                    file.write(chunk)
+    with open(partial, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def evict(keep: str = None):
+    """Removes the least recently used files until the cache fits in max_cache_size"""
+    objects = cache_path("objects", "")
+    entries = []
+    for entry in os.scandir(objects):
+        if entry.is_file():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_cache_size:
+            return
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+
+
+def fetch(source: str, url: str) -> str:
+    """
+    Returns the path of the cached file of source, downloading it from url
+    first when it is not cached. Blocking, run it in a worker thread.
+    """
+    path = lookup(source)
+    if path is not None:
+        return path
+    key = source_digest(source)
+    # Workers downloading the same source wait for each other instead of writing the same file
+    with open(cache_path("locks", key), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        path = lookup(source)
+        if path is not None:
+            return path
+        partial = cache_path("partial", key)
+        digest = download(url, partial)
+        path = cache_path("objects", digest)
+        os.replace(partial, path)
+        pointer = cache_path("sources", key)
+        with open(f"{pointer}.tmp", "w") as file:
+            file.write(digest)
+        os.replace(f"{pointer}.tmp", pointer)
+    evict(keep=path)
+    return path
+
+
+def copy_to(path: str, dest: str):
+    """
+    Copies a cached file to dest, the cached copy must never be modified.
+    Raises FileNotFoundError when the file was evicted since it was looked up.
+    """
+    shutil.copyfile(path, dest)
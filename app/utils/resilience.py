@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+"""
+Retries and circuit breakers for calls to outbound services (email API,
+Cloudinary, S3).
+
+Every provider gets its own circuit breaker and retry budget:
+- failed attempts are retried with exponential backoff and full jitter,
+  awaited with asyncio.sleep so the event loop keeps serving requests
+- retries are only made while the provider's budget allows it, the budget
+  grows by RETRY_BUDGET_RATIO of a token per call, so retries can never
+  multiply the load on a struggling provider
+- after CIRCUIT_FAILURE_THRESHOLD consecutive failures the circuit opens
+  and calls fail fast with CircuitOpenError for CIRCUIT_RESET_TIMEOUT
+  seconds, then a single trial call decides whether it closes again
+"""
+
+import time
+import random
+import asyncio
+import inspect
+import logging
+from app.config.settings import get_settings
+from app.dependencies import metrics
+from app.dependencies.tracing import tracer
+
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+max_attempts = settings.retry_max_attempts
+base_delay = settings.retry_base_delay
+max_delay = settings.retry_max_delay
+budget_ratio = settings.retry_budget_ratio
+budget_max_tokens = settings.retry_budget_max_tokens
+failure_threshold = settings.circuit_failure_threshold
+reset_timeout = settings.circuit_reset_timeout
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+    def __init__(self, provider: str):
+        super().__init__(f"{provider} is unavailable, its circuit is open")
+        self.provider = provider
+
+
+def backoff(attempt: int) -> float:
+    """Seconds to wait before retrying after the given failed attempt (full jitter)"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+class RetryBudget:
+    """Token bucket refilled by calls and drained by retries"""
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half open after a timeout -> closed on success"""
+
+    def __init__(self, threshold: int, timeout: float):
+        self.threshold = threshold
+        self.timeout = timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.timeout:
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+        return self.state == "closed"
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.trial_running = False
+
+    def release(self):
+        """Ends a trial call that tells nothing about the provider's health, leaving the state as is"""
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class Provider:
+    """Circuit breaker, retry budget and call metrics of one outbound service"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.budget = RetryBudget(budget_ratio, budget_max_tokens)
+        self.metrics = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "short_circuited": 0,
+            "budget_exhausted": 0,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "retry_tokens": round(self.budget.tokens, 2),
+            **self.metrics,
+        }
+
+
+providers: dict = {}
+
+
+def get_provider(name: str) -> Provider:
+    if name not in providers:
+        providers[name] = Provider(name)
+    return providers[name]
+
+
+def get_provider_metrics() -> list:
+    """Returns the circuit state and call metrics of every provider"""
+    return [provider.to_dict() for provider in providers.values()]
+
+
+def export_circuit_metrics():
+    """Copies the circuit state of this worker's providers to the metrics gauges"""
+    for provider in providers.values():
+        metrics.outbound_circuit_open.labels(provider.name).set(1 if provider.breaker.state == "open" else 0)
+
+
+def always_retry(error: Exception) -> bool:
+    return True
+
+
+async def call(provider_name: str, function, *args, attempts: int = None,
+               retryable=always_retry, **kwargs):
+    """
+    Calls function (a coroutine function, or a blocking one which then runs
+    in a worker thread) for the named provider with retries and circuit
+    breaking. Errors retryable() rejects (e.g. a 4xx answer) are raised at
+    once and count neither for nor against the provider's health. Raises
+    CircuitOpenError without calling when the circuit is open, or the
+    last error once the attempts or the retry budget run out.
+    """
+    provider = get_provider(provider_name)
+    attempts = attempts or max_attempts
+    provider.metrics["calls"] += 1
+    provider.budget.deposit()
+    for attempt in range(1, attempts + 1):
+        if not provider.breaker.allow():
+            provider.metrics["short_circuited"] += 1
+            metrics.outbound_calls.labels(provider_name, "short_circuited").inc()
+            raise CircuitOpenError(provider_name)
+        started_at = time.perf_counter()
+        try:
+            # One span per attempt, a failed attempt is recorded on its span
+            with tracer.start_as_current_span(f"{provider_name} call", attributes={
+                    "outbound.provider": provider_name, "outbound.attempt": attempt}):
+                if inspect.iscoroutinefunction(function):
+                    result = await function(*args, **kwargs)
+                else:
+                    result = await asyncio.to_thread(function, *args, **kwargs)
+        except Exception as e:
+            metrics.outbound_attempt_duration.labels(provider_name, "error").observe(time.perf_counter() - started_at)
+            if not retryable(e):
+                provider.breaker.release()
+                provider.metrics["failures"] += 1
+                metrics.outbound_calls.labels(provider_name, "rejected").inc()
+                raise
+            provider.breaker.record_failure()
+            logger.warning("%s call failed on attempt %s: %s", provider_name, attempt, str(e))
+            if attempt == attempts:
+                provider.metrics["failures"] += 1
+                metrics.outbound_calls.labels(provider_name, "failure").inc()
+                raise
+            if not provider.budget.withdraw():
+                provider.metrics["budget_exhausted"] += 1
+                provider.metrics["failures"] += 1
+                metrics.outbound_calls.labels(provider_name, "failure").inc()
+                raise
+            provider.metrics["retries"] += 1
+            metrics.outbound_retries.labels(provider_name).inc()
+            await asyncio.sleep(backoff(attempt))
+        except BaseException:
+            # Cancelled mid-call, a half-open circuit must not wait forever for this trial
+            provider.breaker.release()
+            raise
+        else:
+            metrics.outbound_attempt_duration.labels(provider_name, "success").observe(time.perf_counter() - started_at)
+            provider.breaker.record_success()
+            provider.metrics["successes"] += 1
+            metrics.outbound_calls.labels(provider_name, "success").inc()
+            return result
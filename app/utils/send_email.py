@@ -1,25 +1,64 @@
 #!/usr/bin/env python3
 
 """ Module for handling Email delivery """
-import os
-import time
-import requests
+import logging
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-from dotenv import load_dotenv
+from app.config.settings import get_settings
+from app.dependencies.request_timing import record_http_response
+from app.dependencies.tracing import tracer
+from app.utils import resilience
 from pydantic import EmailStr
 
+if TYPE_CHECKING:
+    import requests
 
-load_dotenv()
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
 
 # Initialize Jinja2 environment for template rendering
 # env = Environment(loader=FileSystemLoader("/home/aphrotee/bloomsite-be/app/templates/email"))
-max_retries = int(os.getenv("FILE_UPLOAD_MAX_RETRIES"))
-retry_delay = int(os.getenv("FILE_UPLOAD_RETRY_DELAY"))
+max_retries = settings.file_upload_max_retries
+email_timeout = settings.email_api_timeout
+
+@lru_cache
+def get_session() -> "requests.Session":
+    """
+    Shared session so consecutive sends reuse the connection to the email API.
+    requests is imported on the first send, not when the app starts.
+    """
+    import requests
+    session = requests.Session()
+    session.hooks["response"].append(record_http_response)
+    return session
+
+class EmailAPIError(Exception):
+    """The email API answered with an error status"""
 
-def send_email_background(subject: str, email_to: EmailStr, firstname: str, htmlBody: str):
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"({status_code}) {body}")
+        self.status_code = status_code
+
+def retryable_email_error(error: Exception) -> bool:
+    """Network errors, rate limiting and server errors are retried, other rejections are not"""
+    if isinstance(error, EmailAPIError):
+        return error.status_code == 429 or error.status_code >= 500
+    return True
+
+def post_email(url: str, headers: dict, requestBody: dict) -> "requests.Response":
+    """Sends one email through the email API, raising EmailAPIError if it is not accepted"""
+    response = get_session().post(url, headers=headers, json=requestBody, timeout=email_timeout)
+    if not 200 < response.status_code < 400:
+        raise EmailAPIError(response.status_code, response.text)
+    return response
+
+async def send_email_background(subject: str, email_to: EmailStr, firstname: str, htmlBody: str):
     """Send email in the background with retry mechanism"""
-    fromAddress = os.getenv("MAIL_FROM")
-    apiKey = os.getenv("ZEPTOMAIL_API_KEY")
+    fromAddress = settings.mail_from
+    apiKey = settings.zeptomail_api_key
     
     requestBody = {
         "from": {
@@ -42,19 +81,16 @@ def send_email_background(subject: str, email_to: EmailStr, firstname: str, html
         "Authorization": f"{apiKey}"
     }
 
-    url = os.getenv("ZEPTOMAIL_URL")
-    for attempt in range(1, max_retries + 1):
-        # Send the email
-        response = requests.post(url, headers=headers, json=requestBody)
-        if 200 < response.status_code < 400:
-            print("({}) - Verification email sent successfully to {}".format(response.status_code, email_to))
-            return
-        else:
-            print(f"Error sending email on attempt {attempt}: {response.json()}")
-            if attempt < max_retries:
-                print(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-    print(f"Max retry attempts reached. Error sending email.")
+    url = settings.zeptomail_url
+    with tracer.start_as_current_span("send_email", attributes={"email.subject": subject}) as span:
+        try:
+            # Send the email
+            response = await resilience.call("zeptomail", post_email, url, headers, requestBody,
+                                             attempts=max_retries, retryable=retryable_email_error)
+            logger.info("(%s) - Email sent successfully to %s", response.status_code, email_to)
+        except Exception as e:
+            span.record_exception(e)
+            logger.error("Error sending email to %s: %s", email_to, str(e))
     
     # message = MessageSchema(
     #     subject=subject,
@@ -68,6 +104,14 @@ def send_email_background(subject: str, email_to: EmailStr, firstname: str, html
     # background_tasks.add_task(
     #     fm.send_message, message, template_name=template_name)
 
+async def send_email_batch(messages: list):
+    """
+    Send a batch of emails one after the other over the shared connection.
+    Each message is a (subject, email_to, firstname, htmlBody) tuple
+    """
+    for subject, email_to, firstname, htmlBody in messages:
+        await send_email_background(subject, email_to, firstname, htmlBody)
+
 # import requests
 
 # url = "https://api.zeptomail.com/v1.1/email"
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""
+Measures the per-row cost of serializing a 10k-blog listing:
+
+    old  ORM objects -> to_dict() -> FastAPI response_model validation
+         and encoding -> json.dumps
+    new  column tuples -> TypeAdapter(from_attributes) -> orjson
+
+    $ python -m benchmarks.bench_serialization
+"""
+
+import asyncio
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from app.models.blogs import Blog, BlogResponseSchema, MultipleBlogsResponse
+from app.models.serializers import blogs_adapter, list_response
+
+
+BlogRow = namedtuple("BlogRow", list(BlogResponseSchema.model_fields))
+
+
+def make_blogs(count: int) -> list:
+    now = datetime.now(timezone.utc)
+    author_id = str(uuid.uuid4())
+    return [Blog(id=str(uuid.uuid4()), created_at=now, updated_at=now, author_id=author_id,
+                 author="founder", title=f"Blog {i}", content="Lorem ipsum dolor sit amet " * 20,
+                 tags=["startups", "funding"], status="published")
+            for i in range(count)]
+
+
+async def old_path(blogs: list) -> bytes:
+    rows = list(map(lambda x: x.to_dict(), blogs))
+    field = create_response_field(name="response", type_=MultipleBlogsResponse)
+    content = await serialize_response(field=field, response_content={
+        "success": True,
+        "message": "Published blogs retrieved successfully",
+        "data": {"count": len(rows), "blogs": rows}
+    }, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+def new_path(rows: list) -> bytes:
+    return list_response("Published blogs retrieved successfully", "blogs", blogs_adapter, rows).body
+
+
+def best_of(function, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def main(count: int = 10000):
+    blogs = make_blogs(count)
+    rows = [BlogRow(*(getattr(blog, name) for name in BlogRow._fields)) for blog in blogs]
+    old = best_of(lambda: asyncio.run(old_path(blogs)))
+    new = best_of(lambda: new_path(rows))
+    print(f"{count} blogs")
+    print(f"old: {old * 1000:8.1f} ms total {old / count * 1e6:6.2f} us/row")
+    print(f"new: {new * 1000:8.1f} ms total {new / count * 1e6:6.2f} us/row ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
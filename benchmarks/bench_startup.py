@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+"""
+Measures what a fresh worker pays to load the app: the time to import
+app.main, the resident memory afterwards, and which heavy SDKs got
+imported along the way. Every run imports the app in a new interpreter,
+like a worker process does.
+
+    $ python -m benchmarks.bench_startup
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+
+
+# Run in the child interpreter, prints one json line
+probe = """
+import json, sys, time
+started_at = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started_at
+with open("/proc/self/status") as status:
+    rss_kb = next(int(line.split()[1]) for line in status if line.startswith("VmRSS:"))
+sdks = [name for name in ("boto3", "botocore", "cloudinary", "requests") if name in sys.modules]
+print(json.dumps({"import_ms": elapsed * 1000, "rss_mb": rss_kb / 1024, "modules": len(sys.modules), "sdks": sdks}))
+"""
+
+
+def run_worker() -> dict:
+    output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(runs: int = 7):
+    results = [run_worker() for _ in range(runs)]
+    import_ms = [result["import_ms"] for result in results]
+    rss_mb = [result["rss_mb"] for result in results]
+    print(f"{runs} workers")
+    print(f"import app.main: median {statistics.median(import_ms):7.1f} ms  min {min(import_ms):7.1f} ms")
+    print(f"rss per worker:  median {statistics.median(rss_mb):7.1f} MB  max {max(rss_mb):7.1f} MB")
+    print(f"modules loaded:  {results[-1]['modules']}")
+    print(f"SDKs imported at startup: {', '.join(results[-1]['sdks']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
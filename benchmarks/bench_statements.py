@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+"""
+Measures the Python-side cost of preparing the hot lookups per request:
+building the select and generating its cache key (which SQLAlchemy does
+on every execution to find the compiled SQL), rebuilt every time versus
+the pre-built statements in app.models.queries.
+
+    $ python -m benchmarks.bench_statements
+"""
+
+import timeit
+from app.models import queries
+from app.models.admins import Admin
+from app.models.blogs import Blog
+from app.models.users import User
+from sqlalchemy import func, select
+
+
+hot_paths = {
+    "get_admin": (lambda: select(Admin).filter_by(id="id"), queries.admin_by_id),
+    "get_user": (lambda: select(User).filter_by(id="id"), queries.user_by_id),
+    "admin login": (lambda: select(Admin).where(func.lower(Admin.username) == "founder"),
+                    queries.admin_by_username),
+    "user login": (lambda: select(User).where(func.lower(User.email) == "founder@gmail.com"),
+                   queries.user_by_email),
+    "blog listing": (lambda: select(Blog).filter_by(status="published"), queries.blogs_by_status),
+}
+
+
+def main(number: int = 20000):
+    print(f"{'hot path':<14}{'rebuilt (us)':>14}{'pre-built (us)':>16}{'speedup':>10}")
+    for name, (build, statement) in hot_paths.items():
+        rebuilt = timeit.timeit(lambda: build()._generate_cache_key(), number=number)
+        prebuilt = timeit.timeit(lambda: statement._generate_cache_key(), number=number)
+        print(f"{name:<14}{rebuilt / number * 1e6:>14.2f}{prebuilt / number * 1e6:>16.2f}"
+              f"{rebuilt / prebuilt:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+"""
+Compares two load test reports of loadtests.run, e.g. before and after a
+change, endpoint by endpoint.
+
+    $ python -m loadtests.compare loadtests/results/a1b2c3d.json loadtests/results/e4f5a6b.json
+"""
+
+import sys
+import json
+
+
+metrics = [("throughput_rps", "rps"), ("p50_ms", "p50 ms"), ("p99_ms", "p99 ms")]
+
+
+def change(before, after) -> str:
+    if before is None or after is None:
+        return f"{'-':>22}"
+    percent = f"{(after - before) / before * 100:+.0f}%" if before else ""
+    return f"{before:>8.1f}{after:>8.1f}{percent:>6}"
+
+
+def main(before_path: str, after_path: str):
+    with open(before_path) as before_file, open(after_path) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    print(f"{before['commit']} -> {after['commit']}")
+    print(f"{'endpoint':<40}" + "".join(f"{label:>22}" for _, label in metrics) + f"{'errors':>12}")
+    endpoints = list(dict.fromkeys(list(before["endpoints"]) + list(after["endpoints"])))
+    rows = [(endpoint, before["endpoints"].get(endpoint, {}), after["endpoints"].get(endpoint, {}))
+            for endpoint in endpoints] + [("total", before["total"], after["total"])]
+    for endpoint, old, new in rows:
+        errors = f"{old.get('errors', '-')}->{new.get('errors', '-')}"
+        print(f"{endpoint:<40}" + "".join(change(old.get(key), new.get(key)) for key, _ in metrics) + f"{errors:>12}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+"""
+Stand-in for the ZeptoMail API during load tests: accepts every email
+after a configurable delay, like the real API would, and counts them.
+Point ZEPTOMAIL_URL at it, e.g. http://127.0.0.1:8025/v1.1/email
+
+    $ python -m loadtests.email_stub --port 8025 --latency-ms 80
+"""
+
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class EmailStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency)
+        try:
+            recipients = len(json.loads(body).get("to", []))
+        except ValueError:
+            self.reply(400, {"error": "invalid json"})
+            return
+        with self.server.lock:
+            self.server.sent += recipients
+        self.reply(201, {"data": [{"code": "EM_104", "message": "Email request received"}], "message": "OK"})
+
+    def reply(self, status: int, data: dict):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port: int, latency_ms: float = 80) -> ThreadingHTTPServer:
+    """Serves the stub on a background thread and returns the server, shut it down with .shutdown()"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), EmailStubHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.sent = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in for the ZeptoMail API")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    args = parser.parse_args()
+    server = start(args.port, args.latency_ms)
+    print(f"Email stub listening on http://127.0.0.1:{args.port}/v1.1/email")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""
+Scripted user journeys of the load test. Each scenario is one iteration
+of a virtual user, run in a loop by loadtests.run; every request is timed
+under the route template it hits, e.g. "PUT /blogs/{blog_id}/update".
+"""
+
+import time
+import random
+from collections import defaultdict
+from uuid import uuid4
+
+import httpx
+
+
+class ScenarioError(Exception):
+    """A request of the scenario failed, the iteration is abandoned"""
+
+
+class Recorder:
+    """Latency samples and errors per endpoint, kept only while recording is on"""
+
+    def __init__(self):
+        self.recording = False
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str, url: str,
+                      expect: tuple = (200,), **kwargs) -> httpx.Response:
+        method = endpoint.split(" ", 1)[0]
+        started_at = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            if self.recording:
+                self.errors[endpoint] += 1
+            raise ScenarioError(f"{endpoint}: {e!r}")
+        elapsed = time.perf_counter() - started_at
+        if self.recording:
+            self.samples[endpoint].append(elapsed)
+            if response.status_code not in expect:
+                self.errors[endpoint] += 1
+        if response.status_code not in expect:
+            raise ScenarioError(f"{endpoint}: {response.status_code} {response.text[:200]}")
+        return response
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def browse_blogs(client: httpx.AsyncClient, recorder: Recorder, context: dict):
+    """An anonymous visitor reading the landing page"""
+    await recorder.request(client, "GET /blogs/published/all", "/blogs/published/all")
+
+
+async def admin_blog_crud(client: httpx.AsyncClient, recorder: Recorder, context: dict):
+    """An admin logging in, drafting a blog, publishing it and deleting it"""
+    response = await recorder.request(client, "POST /auth/admins/login", "/auth/admins/login",
+                                      data={"username": context["admin_username"],
+                                            "password": context["admin_password"]})
+    headers = bearer(response.json()["access_token"])
+    blog = {"title": f"Load test {uuid4().hex[:8]}", "content": "Lorem ipsum " * 200,
+            "status": "draft", "tags": random.sample(["fintech", "agritech", "health", "climate"], 2)}
+    response = await recorder.request(client, "POST /blogs/new", "/blogs/new", expect=(201,),
+                                      json=blog, headers=headers)
+    blog_id = response.json()["data"]["id"]
+    await recorder.request(client, "GET /blogs/drafts/all", "/blogs/drafts/all", headers=headers)
+    await recorder.request(client, "PUT /blogs/{blog_id}/update", f"/blogs/{blog_id}/update",
+                           json={**blog, "status": "published"}, headers=headers)
+    await recorder.request(client, "DELETE /blogs/{blog_id}/delete", f"/blogs/{blog_id}/delete",
+                           expect=(204,), headers=headers)
+
+
+async def user_onboarding(client: httpx.AsyncClient, recorder: Recorder, context: dict):
+    """A new user verifying their email, setting a password and a PIN, and signing in"""
+    email = f"load-{uuid4().hex}@example.com"
+    password = "load-test-password"
+    pin = "2468"
+    await recorder.request(client, "POST /users/send-otp", "/users/send-otp", expect=(201,),
+                           json={"email": email, "type": "startup"})
+    # The email goes to the stub, the otp is read where the app keeps it
+    otp = await context["redis"].get(email)
+    if otp is None:
+        raise ScenarioError(f"No otp stored for {email}")
+    await recorder.request(client, "PUT /users/verify-otp", "/users/verify-otp",
+                           json={"email": email, "otp": otp.decode()})
+    await recorder.request(client, "PUT /users/set-password", "/users/set-password",
+                           json={"email": email, "password": password})
+    await recorder.request(client, "PUT /users/set-pin", "/users/set-pin",
+                           json={"email": email, "password": password, "pin": pin})
+    response = await recorder.request(client, "POST /users/auth/password-login", "/users/auth/password-login",
+                                      data={"username": email, "password": password})
+    response = await recorder.request(client, "POST /users/auth/pin-login", "/users/auth/pin-login",
+                                      data={"username": email, "password": pin},
+                                      headers={"X-Password-Authorization-Token": response.json()["access_token"]})
+    await recorder.request(client, "GET /users/me", "/users/me", headers=bearer(response.json()["access_token"]))
+
+
+scenarios = {
+    "browse": browse_blogs,
+    "admin": admin_blog_crud,
+    "onboarding": user_onboarding,
+}
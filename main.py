@@ -1,13 +1,96 @@
 #!/usr/bin/env python3
 
-"""Entry point for the app"""
+"""
+Entry point for the app in production:
 
+    $ python main.py
 
-from dotenv import load_dotenv
+Runs the app in gunicorn with uvicorn workers on uvloop and httptools,
+one worker per CPU unless WEB_CONCURRENCY is set. The app is imported
+once before the workers are forked, so they share its memory
+copy-on-write; connections are only opened in the workers, by the app
+lifespan. On SIGTERM the workers stop accepting connections, finish the
+requests in flight and close their pools, within SERVER_GRACEFUL_TIMEOUT.
+
+The workers write their metrics to PROMETHEUS_MULTIPROC_DIR, emptied on
+every start, so whichever worker answers GET /metrics reports them all.
+
+For development run `uvicorn app.main:app --reload` instead.
+"""
+
+import os
+import tempfile
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+from app.config.settings import get_settings
+
+
+settings = get_settings()
+
+
+class Worker(UvicornWorker):
+    """uvicorn worker running on uvloop and httptools"""
+
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        # Cancel requests still running a little before gunicorn kills the
+        # worker, so the lifespan shutdown gets to close the pools
+        "timeout_graceful_shutdown": max(1, settings.server_graceful_timeout - 5),
+    }
+
+
+class Server(BaseApplication):
+    """gunicorn configured from the app settings instead of the command line"""
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+        return app
+
+
+def prepare_metrics_dir() -> str:
+    """Creates the shared metrics directory and removes the files of a previous run"""
+    directory = settings.prometheus_multiproc_dir or os.path.join(tempfile.gettempdir(), "ouul-metrics")
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".db"):
+            os.remove(os.path.join(directory, name))
+    # prometheus_client reads it when the app is imported, before the fork
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    return directory
+
+
+def child_exit(server, worker):
+    """Drops the live gauges of a worker that exited"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def server_options() -> dict:
+    return {
+        "bind": f"{settings.server_host}:{settings.server_port}",
+        "workers": settings.workers,
+        "worker_class": Worker,
+        "preload_app": True,
+        "backlog": settings.server_backlog,
+        "keepalive": settings.server_keepalive_timeout,
+        "timeout": settings.server_worker_timeout,
+        "graceful_timeout": settings.server_graceful_timeout,
+        "max_requests": settings.server_max_requests,
+        "max_requests_jitter": settings.server_max_requests_jitter,
+        "forwarded_allow_ips": settings.forwarded_allow_ips,
+        "child_exit": child_exit,
+    }
 
-# Load the environment variables from the .env file
-load_dotenv()
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    prepare_metrics_dir()
+    Server(server_options()).run()
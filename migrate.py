@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+"""Applies pending schema migrations to the database selected by ENVIRONMENT"""
+
+import sys
+import argparse
+
+from sqlalchemy import create_engine
+from app.dependencies.database import database_url
+from app.migrations import MigrationError, run_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print the statements pending migrations would run without applying them")
+    parser.add_argument("--target", type=int, default=None,
+                        help="only apply migrations up to and including this version")
+    args = parser.parse_args()
+
+    engine = create_engine(database_url)
+    try:
+        plan = run_migrations(engine, target=args.target, dry_run=args.dry_run)
+    except MigrationError as e:
+        sys.exit(f"Migration aborted: {e}")
+    finally:
+        engine.dispose()
+
+    if not plan:
+        print("Database schema is up to date")
+    for migration in plan:
+        action = "Would apply" if args.dry_run else "Applied"
+        print(f"{action} {migration['version']:04d}: {migration['description']}")
+        for statement in migration["statements"]:
+            print(f"    {statement}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+"""
+Helpers asserting how many SQL statements, Redis commands and outbound
+HTTP calls an endpoint makes, read from the Server-Timing header every
+response carries. A new N+1 query fails the budget instead of slowing
+production down.
+"""
+
+import re
+
+
+metric = re.compile(r'(\w+);dur=([\d.]+)(?:;desc="(\d+)")?')
+
+
+def server_timing(response) -> dict:
+    """Returns {kind: (count, duration_ms)} from a response's Server-Timing header"""
+    timings = {}
+    for kind, duration, count in metric.findall(response.headers.get("Server-Timing", "")):
+        timings[kind] = (int(count or 0), float(duration))
+    return timings
+
+
+class QueryBudgetMixin:
+    """unittest mixin for asserting per-request budgets, e.g. assertQueryBudget(response, db=2, cache=1)"""
+
+    def assertQueryBudget(self, response, **budget):
+        self.assertIn("Server-Timing", response.headers, "response has no Server-Timing header")
+        timings = server_timing(response)
+        for kind, limit in budget.items():
+            count = timings.get(kind, (0, 0.0))[0]
+            self.assertLessEqual(count, limit,
+                                 f"{response.request.method} {response.request.url.path} made "
+                                 f"{count} {kind} calls, the budget is {limit}")
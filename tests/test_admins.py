@@ -1,12 +1,8 @@
 #!/usr/bin/env python3
 
-from app.main import app
-from fastapi.testclient import TestClient
-from tests.tests_base import TestsBase
+from tests.tests_base import TestsBase, client
 
 
-client = TestClient(app)
-
 class AdminsTest(TestsBase):    
     def test_admin_a_deactivation(self):
         response = client.put(f"/admins/{self.editor.id}/deactivate", headers=self.adminHeaders)
@@ -8,12 +8,22 @@ from app.main import app
 from dotenv import load_dotenv
 from fastapi.testclient import TestClient
 from app.models.admins import Admin
-from app.dependencies.database import get_db
+from app.dependencies.database import get_sync_db
 
 # Load the environment variables from the .env file
 load_dotenv()
 client = TestClient(app)
 
+
+def setUpModule():
+    # Runs the app lifespan, its pools are created and closed on the loop of the client
+    client.__enter__()
+
+
+def tearDownModule():
+    client.__exit__(None, None, None)
+
+
 class SuperuserSignupTest(unittest.TestCase):
     
     @classmethod
@@ -23,7 +33,7 @@ class SuperuserSignupTest(unittest.TestCase):
         cls.username = ''.join(random.choices(string.ascii_lowercase, k=7))
         cls.email = f"{cls.username}@gmail.com"
         cls.password = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-        cls.db_gen = get_db()
+        cls.db_gen = get_sync_db()
         cls.db = next(cls.db_gen)
         cls.admin = None
 
@@ -119,7 +129,7 @@ class AdminLoginTest(unittest.TestCase):
         cls.username = ''.join(random.choices(string.ascii_lowercase, k=7))
         cls.email = f"{cls.username}@gmail.com"
         cls.password = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-        cls.db_gen = get_db()
+        cls.db_gen = get_sync_db()
         cls.db = next(cls.db_gen)
         data = {
             "username": cls.username,
@@ -140,7 +150,7 @@ class AdminLoginTest(unittest.TestCase):
             cls.db.commit()
     
     def setUp(self) -> None:
-        self.db = get_db()
+        self.db = get_sync_db()
     
     def test_login(self):
         loginData = {
@@ -211,7 +221,7 @@ class EditorSignupTest(unittest.TestCase):
         cls.editorUsername = ''.join(random.choices(string.ascii_lowercase, k=7))
         cls.editorEmail = f"{cls.editorUsername}@gmail.com"
         cls.password = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-        cls.db_gen = get_db()
+        cls.db_gen = get_sync_db()
         cls.db = next(cls.db_gen)
         cls.editor = None
         data = {
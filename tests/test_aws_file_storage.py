@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import os
+import asyncio
+import tempfile
+import unittest
+from boto3.s3.transfer import TransferConfig
+from app.utils import aws_file_storage
+
+
+@unittest.skipUnless(os.getenv("AWS_S3_ENDPOINT_URL"), "needs an S3 stand-in, set AWS_S3_ENDPOINT_URL")
+class S3TransferTest(unittest.TestCase):
+    """Runs against a local S3 compatible server such as minio"""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.bucket = os.getenv("AWS_S3_BUCKET_NAME") or "ouul-test"
+        s3 = aws_file_storage.get_s3_client()
+        buckets = [bucket["Name"] for bucket in s3.list_buckets()["Buckets"]]
+        if cls.bucket not in buckets:
+            s3.create_bucket(Bucket=cls.bucket)
+        # 5MB is the smallest part s3 accepts
+        cls.transfer_config = aws_file_storage.transfer_config
+        aws_file_storage.transfer_config = TransferConfig(multipart_threshold=5 * 1024 * 1024,
+                                                          multipart_chunksize=5 * 1024 * 1024,
+                                                          max_concurrency=4)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        aws_file_storage.transfer_config = cls.transfer_config
+
+    def test_shared_client(self):
+        self.assertIs(aws_file_storage.get_s3_client(), aws_file_storage.get_s3_client())
+
+    def test_multipart_upload_and_ranged_download(self):
+        content = os.urandom(12 * 1024 * 1024)
+        with tempfile.SpooledTemporaryFile() as file, tempfile.TemporaryDirectory() as directory:
+            file.write(content)
+            uploaded = asyncio.run(aws_file_storage.upload_file_to_cloud(file, self.bucket, "test/large.mp4", "video/mp4"))
+            self.assertTrue(uploaded)
+            s3 = aws_file_storage.get_s3_client()
+            head = s3.head_object(Bucket=self.bucket, Key="test/large.mp4")
+            # Multipart uploads get an etag of the form <md5 of part md5s>-<number of parts>
+            self.assertTrue(head["ETag"].strip('"').endswith("-3"))
+
+            dest = os.path.join(directory, "large.mp4")
+            downloaded = asyncio.run(aws_file_storage.get_file_from_cloud("large.mp4", dest, self.bucket, "test/large.mp4"))
+            self.assertTrue(downloaded)
+            with open(dest, "rb") as result:
+                self.assertEqual(result.read(), content)
+            s3.delete_object(Bucket=self.bucket, Key="test/large.mp4")
+
+    def test_missing_object_is_not_retried(self):
+        with tempfile.TemporaryDirectory() as directory:
+            dest = os.path.join(directory, "missing")
+            self.assertFalse(asyncio.run(aws_file_storage.get_file_from_cloud("missing", dest, self.bucket, "test/missing")))
+
+
+if __name__ == "__main__":
+    unittest.main()
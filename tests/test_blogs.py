@@ -1,14 +1,10 @@
 #!/usr/bin/env python3
 
 import unittest
-from app.main import app
-from fastapi.testclient import TestClient
 from app.models.blogs import Blog
-from tests.tests_base import TestsBase
+from tests.tests_base import TestsBase, client
 
 
-client = TestClient(app)
-
 class BlogsTest(TestsBase):
     def deleteRow(self, row):
         """Delete a row used in this testcase from the database"""
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+
+import unittest
+from app.dependencies.db_pool import pool_sizes, PoolStats
+
+
+class DBPoolTest(unittest.TestCase):
+    def test_pool_sizes_stay_within_budget(self):
+        for budget, workers in [(90, 1), (90, 4), (100, 8), (20, 3)]:
+            pool_size, max_overflow = pool_sizes(budget, workers)
+            self.assertGreaterEqual(pool_size, 1)
+            self.assertLessEqual((pool_size + max_overflow) * workers, budget)
+        self.assertEqual(pool_sizes(90, 4), (17, 5))
+
+    def test_pool_sizes_with_more_workers_than_connections(self):
+        self.assertEqual(pool_sizes(8, 8), (1, 0))
+        with self.assertRaises(ValueError):
+            pool_sizes(4, 8)
+
+    def test_wait_stats(self):
+        stats = PoolStats("primary")
+        stats.record_wait(2.0)
+        stats.record_wait(4.0)
+        data = stats.to_dict()
+        self.assertEqual(data["wait_mean_ms"], 3.0)
+        self.assertEqual(data["wait_max_ms"], 4.0)
+        self.assertNotIn("checked_out", data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import unittest
+from app.utils.email_bloom_filter import filter_size, bit_positions, num_bits, num_hashes
+
+
+class EmailBloomFilterTest(unittest.TestCase):
+    def test_filter_size(self):
+        bits, hashes = filter_size(1000000, 0.001)
+        self.assertEqual(bits, 14377588)
+        self.assertEqual(hashes, 10)
+        bits, hashes = filter_size(1000, 0.01)
+        self.assertEqual(bits, 9586)
+        self.assertEqual(hashes, 7)
+
+    def test_bit_positions(self):
+        positions = bit_positions("founder@gmail.com")
+        self.assertEqual(len(positions), num_hashes)
+        self.assertEqual(positions, bit_positions("founder@gmail.com"))
+        self.assertTrue(all(0 <= position < num_bits for position in positions))
+        self.assertNotEqual(positions, bit_positions("investor@gmail.com"))
+
+    def test_false_positive_rate(self):
+        bits = set()
+        for i in range(20000):
+            bits.update(bit_positions(f"user{i}@gmail.com"))
+        for i in range(20000):
+            self.assertTrue(all(position in bits for position in bit_positions(f"user{i}@gmail.com")))
+        false_positives = sum(all(position in bits for position in bit_positions(f"stranger{i}@gmail.com"))
+                              for i in range(20000))
+        self.assertLess(false_positives, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import json
+import queue
+import logging
+import unittest
+from app.config import logging_config
+
+
+def make_record(name: str, level: int, message: str, *args, **extra) -> logging.LogRecord:
+    record = logging.LogRecord(name, level, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class LoggingConfigTest(unittest.TestCase):
+    def test_json_records_carry_request_id_and_extra(self):
+        token = logging_config.request_id.set("req-1")
+        try:
+            record = make_record("app.access", logging.INFO, "GET %s %s", "/blogs", 200, status=200)
+            logging_config.RequestIdFilter().filter(record)
+        finally:
+            logging_config.request_id.reset(token)
+        data = json.loads(logging_config.JsonFormatter().format(record))
+        self.assertEqual(data["message"], "GET /blogs 200")
+        self.assertEqual(data["request_id"], "req-1")
+        self.assertEqual(data["status"], 200)
+        self.assertEqual(data["logger"], "app.access")
+
+    def test_sampling_keeps_warnings(self):
+        sampler = logging_config.SamplingFilter({"app.access": 0.0, "app": 1.0})
+        self.assertFalse(sampler.filter(make_record("app.access", logging.INFO, "GET / 200")))
+        self.assertTrue(sampler.filter(make_record("app.access", logging.WARNING, "GET / 500")))
+        self.assertTrue(sampler.filter(make_record("app.sql", logging.INFO, "query")))
+
+    def test_full_queue_drops_records(self):
+        handler = logging_config.NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        handler.handle(make_record("app", logging.INFO, "first"))
+        handler.handle(make_record("app", logging.INFO, "second"))
+        self.assertEqual(handler.queue.get_nowait().getMessage(), "first")
+        self.assertEqual(handler.dropped, 1)
+
+    def test_parse_pairs(self):
+        self.assertEqual(logging_config.parse_pairs("app.sql=WARNING, botocore=ERROR,,bad"),
+                         {"app.sql": "WARNING", "botocore": "ERROR"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.utils import media_cache
+
+
+files = {"/a.mp4": os.urandom(300000), "/b.jpg": os.urandom(200000), "/c.jpg": os.urandom(200000)}
+requests_seen = []
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves the test files with support for Range requests"""
+
+    def do_GET(self):
+        content = files[self.path]
+        requests_seen.append((self.path, self.headers.get("Range")))
+        start = 0
+        if self.headers.get("Range"):
+            start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(content) - start))
+        self.end_headers()
+        self.wfile.write(content[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+class MediaCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir, self.max_cache_size = media_cache.cache_dir, media_cache.max_cache_size
+        media_cache.cache_dir = self.directory.name
+        requests_seen.clear()
+
+    def tearDown(self):
+        media_cache.cache_dir, media_cache.max_cache_size = self.cache_dir, self.max_cache_size
+        self.directory.cleanup()
+
+    def test_repeated_fetches_are_served_from_disk(self):
+        path = media_cache.fetch("cloudinary:video:a", f"{self.base_url}/a.mp4")
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), files["/a.mp4"])
+        self.assertEqual(media_cache.fetch("cloudinary:video:a", f"{self.base_url}/a.mp4"), path)
+        self.assertEqual(len(requests_seen), 1)
+
+    def test_same_content_is_stored_once(self):
+        first = media_cache.fetch("cloudinary:video:a", f"{self.base_url}/a.mp4")
+        second = media_cache.fetch("s3:media/a.mp4", f"{self.base_url}/a.mp4")
+        self.assertEqual(first, second)
+
+    def test_interrupted_download_resumes(self):
+        partial = media_cache.cache_path("partial", media_cache.source_digest("cloudinary:video:a"))
+        with open(partial, "wb") as file:
+            file.write(files["/a.mp4"][:120000])
+        path = media_cache.fetch("cloudinary:video:a", f"{self.base_url}/a.mp4")
+        self.assertEqual(requests_seen, [("/a.mp4", "bytes=120000-")])
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), files["/a.mp4"])
+
+    def test_least_recently_used_files_are_evicted(self):
+        media_cache.max_cache_size = 450000
+        first = media_cache.fetch("b", f"{self.base_url}/b.jpg")
+        os.utime(first, (1, 1))
+        media_cache.fetch("c", f"{self.base_url}/c.jpg")
+        self.assertTrue(os.path.exists(first))
+        media_cache.fetch("a", f"{self.base_url}/a.mp4")
+        self.assertFalse(os.path.exists(first))
+        self.assertIsNone(media_cache.lookup("b"))
+        self.assertIsNotNone(media_cache.lookup("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
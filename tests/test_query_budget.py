@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import unittest
+from app.models.blogs import Blog
+from app.dependencies.request_timing import RequestTimings
+from tests.tests_base import TestsBase, client
+from tests.query_budget import QueryBudgetMixin, server_timing
+
+
+class ServerTimingTest(unittest.TestCase):
+    def test_server_timing_header(self):
+        timings = RequestTimings()
+        timings.record("db", 1.5)
+        timings.record("db", 2.25)
+        timings.record("cache", 0.5, count=3)
+        header = timings.server_timing()
+        self.assertTrue(header.startswith('db;dur=3.8;desc="2", cache;dur=0.5;desc="3", total;dur='))
+        self.assertNotIn("bcrypt", header)
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestsBase):
+    def test_published_blogs_budget(self):
+        response = client.get("/blogs/published/all")
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget(response, db=1, cache=0, http=0)
+
+    def test_admin_details_budget(self):
+        response = client.get("/admins/me", headers=self.adminHeaders)
+        self.assertEqual(response.status_code, 200)
+        self.assertQueryBudget(response, db=1, http=0)
+
+    def test_update_blog_budget(self):
+        blogData = {
+            "title": "Test Blog",
+            "content": "This is a test draft blog",
+            "status": "draft",
+            "tags": []
+        }
+        response = client.post("/blogs/new", json=blogData, headers=self.adminHeaders)
+        self.assertEqual(response.status_code, 201)
+        self.assertQueryBudget(response, db=2, http=0)
+        blogId = response.json()["data"]["id"]
+        blogData["status"] = "published"
+        response = client.put(f"/blogs/{blogId}/update", json=blogData, headers=self.adminHeaders)
+        self.assertEqual(response.status_code, 200)
+        # admin, blog, update and the reload of the updated blog
+        self.assertQueryBudget(response, db=4, http=0)
+        timings = server_timing(response)
+        self.assertIn("total", timings)
+        blog = self.db.query(Blog).filter(Blog.id == blogId).first()
+        self.db.delete(blog)
+        self.db.commit()
+
+
+if __name__ == "__main__":
+    unittest.main()
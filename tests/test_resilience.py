@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import asyncio
+import unittest
+from prometheus_client import REGISTRY
+from app.utils import resilience
+
+
+class ResilienceTest(unittest.TestCase):
+    def setUp(self):
+        resilience.providers.clear()
+        self.base_delay = resilience.base_delay
+        resilience.base_delay = 0
+
+    def tearDown(self):
+        resilience.base_delay = self.base_delay
+        resilience.providers.clear()
+
+    def test_retries_until_success(self):
+        calls = []
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ConnectionError("reset")
+            return "sent"
+        self.assertEqual(asyncio.run(resilience.call("email", flaky, attempts=3)), "sent")
+        metrics = resilience.get_provider("email").metrics
+        self.assertEqual(metrics["retries"], 2)
+        self.assertEqual(metrics["successes"], 1)
+
+    def test_rejections_are_not_retried(self):
+        calls = []
+        async def rejected():
+            calls.append(1)
+            raise ValueError("bad request")
+        with self.assertRaises(ValueError):
+            asyncio.run(resilience.call("email", rejected, attempts=3,
+                                        retryable=lambda e: not isinstance(e, ValueError)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(resilience.get_provider("email").breaker.state, "closed")
+
+    def test_circuit_opens_and_fails_fast(self):
+        calls = []
+        def down():
+            calls.append(1)
+            raise ConnectionError("down")
+        for _ in range(resilience.failure_threshold):
+            with self.assertRaises(ConnectionError):
+                asyncio.run(resilience.call("storage", down, attempts=1))
+        self.assertEqual(resilience.get_provider("storage").breaker.state, "open")
+        with self.assertRaises(resilience.CircuitOpenError):
+            asyncio.run(resilience.call("storage", down, attempts=1))
+        self.assertEqual(len(calls), resilience.failure_threshold)
+        self.assertEqual(resilience.get_provider("storage").metrics["short_circuited"], 1)
+
+    def test_half_open_trial_closes_circuit(self):
+        breaker = resilience.CircuitBreaker(threshold=1, timeout=0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_rejection_keeps_failure_count(self):
+        breaker = resilience.get_provider("email").breaker
+        breaker.failures = 2
+        async def rejected():
+            raise ValueError("bad request")
+        with self.assertRaises(ValueError):
+            asyncio.run(resilience.call("email", rejected, retryable=lambda e: False))
+        self.assertEqual(breaker.failures, 2)
+
+    def test_cancelled_trial_is_released(self):
+        breaker = resilience.get_provider("storage").breaker
+        breaker.state, breaker.opened_at, breaker.timeout = "open", 0.0, 0
+        async def cancel_trial():
+            trial = asyncio.create_task(resilience.call("storage", asyncio.sleep, 10))
+            await asyncio.sleep(0)
+            trial.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await trial
+        asyncio.run(cancel_trial())
+        self.assertEqual(breaker.state, "half_open")
+        self.assertTrue(breaker.allow())
+
+    def test_retry_budget(self):
+        budget = resilience.RetryBudget(ratio=0.5, max_tokens=1)
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+
+    def test_prometheus_metrics(self):
+        def sample(name, labels):
+            return REGISTRY.get_sample_value(name, labels) or 0
+        retries = sample("outbound_retries_total", {"provider": "sms"})
+        successes = sample("outbound_calls_total", {"provider": "sms", "result": "success"})
+        calls = []
+        def flaky():
+            calls.append(1)
+            if len(calls) < 2:
+                raise ConnectionError("reset")
+            return "sent"
+        asyncio.run(resilience.call("sms", flaky, attempts=2))
+        self.assertEqual(sample("outbound_retries_total", {"provider": "sms"}), retries + 1)
+        self.assertEqual(sample("outbound_calls_total", {"provider": "sms", "result": "success"}), successes + 1)
+        resilience.export_circuit_metrics()
+        self.assertEqual(sample("outbound_circuit_open", {"provider": "sms"}), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import tempfile
+import unittest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from app.dependencies.tracing import FileSpanExporter
+
+
+class TracingTest(unittest.TestCase):
+    def test_file_exporter_writes_json_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            provider = TracerProvider()
+            provider.add_span_processor(SimpleSpanProcessor(FileSpanExporter(directory)))
+            tracer = provider.get_tracer("test")
+            with tracer.start_as_current_span("POST /auth/admins/login"):
+                with tracer.start_as_current_span("bcrypt verify"):
+                    pass
+            with open(os.path.join(directory, f"traces-{os.getpid()}.jsonl")) as traces:
+                spans = [json.loads(line) for line in traces]
+            self.assertEqual([span["name"] for span in spans], ["bcrypt verify", "POST /auth/admins/login"])
+            self.assertEqual(spans[0]["parent_id"], spans[1]["context"]["span_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,17 +8,21 @@ from app.main import app
 from dotenv import load_dotenv
 from fastapi.testclient import TestClient
 from app.models.admins import Admin
-from app.dependencies.database import get_db
+from app.dependencies.database import get_sync_db
 
 # Load the environment variables from the .env file
 load_dotenv()
 
+# Shared by the test modules, so the pools live on the event loop of one client
 client = TestClient(app)
 
 class TestsBase(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls) -> None:
+        # Runs the app lifespan, its pools are created and closed on the loop of the client
+        client.__enter__()
+        cls.addClassCleanup(client.__exit__, None, None, None)
         # using random.choices()
         # generating random strings
         cls.adminUsername = ''.join(random.choices(string.ascii_lowercase, k=7))
@@ -26,7 +30,7 @@ class TestsBase(unittest.TestCase):
         cls.editorUsername = ''.join(random.choices(string.ascii_lowercase, k=7))
         cls.editorEmail = f"{cls.editorUsername}@gmail.com"
         cls.password = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-        cls.db_gen = get_db()
+        cls.db_gen = get_sync_db()
         cls.db = next(cls.db_gen)
         data = {
             "username": cls.adminUsername,